@@ -0,0 +1,69 @@
+import asyncio
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncAIRunner:
+    """One ``AsyncOpenAI`` client per process, driven by a private event loop thread.
+
+    Request threads (sync, gthread, or the threadpool behind an ASGI adapter)
+    hand coroutines to the loop and wait on the result, so all AI traffic in a
+    worker shares one keep-alive connection pool and one concurrency semaphore.
+    """
+
+    def __init__(self, client_factory, max_concurrency: int = 32):
+        self.client_factory = client_factory
+        self.max_concurrency = max(1, int(max_concurrency))
+        self._lock = threading.Lock()
+        self._pid = None
+        self._loop = None
+        self._client = None
+        self._semaphore = None
+
+    def _ensure_started(self):
+        # A forked worker inherits the parent's objects but not its loop thread.
+        if self._pid == os.getpid() and self._loop is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="ai-async-loop", daemon=True)
+            thread.start()
+            self._loop = loop
+            self._client = asyncio.run_coroutine_threadsafe(self._setup(), loop).result()
+            self._pid = os.getpid()
+
+    async def _setup(self):
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self.client_factory()
+
+    async def _create(self, kwargs):
+        async with self._semaphore:
+            return await self._client.chat.completions.create(**kwargs)
+
+    def chat_completion(self, timeout: float = None, **kwargs):
+        """Blocking wrapper around ``client.chat.completions.create``."""
+        self._ensure_started()
+        future = asyncio.run_coroutine_threadsafe(self._create(kwargs), self._loop)
+        try:
+            return future.result(timeout)
+        except Exception:
+            future.cancel()
+            raise
+
+    def close(self):
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                return
+            if self._client is not None:
+                try:
+                    asyncio.run_coroutine_threadsafe(self._client.close(), self._loop).result(5)
+                except Exception as e:
+                    logger.warning("Async AI client close failed: %s", e)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = self._client = self._semaphore = None
+            self._pid = None
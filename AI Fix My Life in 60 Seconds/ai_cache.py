@@ -0,0 +1,158 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+
+def completion_key(model: str, prompt: str, max_tokens: int, temperature: float) -> str:
+    """Content address for a completion request.
+
+    Whitespace in the prompt is collapsed so cosmetic edits to a problem text
+    (trailing newlines, double spaces) land on the same entry.
+    """
+    normalized = {
+        "model": (model or "").strip(),
+        "prompt": " ".join((prompt or "").split()),
+        "max_tokens": int(max_tokens),
+        "temperature": round(float(temperature), 2),
+    }
+    raw = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """Two-tier cache for LLM completions: in-process LRU in front of a DB table.
+
+    ``entry_model`` is a SQLAlchemy model with ``key``, ``value``,
+    ``created_at``, ``expires_at`` and ``last_used_at`` columns; ``engine``
+    returns the engine its table lives in. Without them the cache is
+    memory-only.
+
+    The DB tier runs on its own short connections, never on the caller's
+    session, so a lookup or store can neither flush, commit nor roll back the
+    caller's pending work. Reads never write: the ``last_used_at`` of rows hit
+    in the DB tier is kept in memory and written back in one batch by ``evict``.
+    """
+
+    def __init__(self, entry_model=None, engine=None, max_entries: int = 512,
+                 ttl_seconds: int = 7 * 24 * 3600, max_rows: int = 20000, evict_every: int = 100):
+        self.entry_model = entry_model
+        self.engine = engine
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = int(ttl_seconds)
+        self.max_rows = int(max_rows)
+        self.evict_every = max(1, int(evict_every))
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._touched = {}
+        self.counters = {"memory_hits": 0, "db_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] += n
+
+    def _remember(self, key: str, value: str, expires_at: float):
+        with self._lock:
+            self._lru[key] = (value, expires_at)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            hit = self._lru.get(key)
+            if hit is not None:
+                if hit[1] > now:
+                    self._lru.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return hit[0]
+                del self._lru[key]
+        if self.entry_model is not None:
+            table = self.entry_model.__table__
+            try:
+                with self.engine().connect() as conn:
+                    row = conn.execute(select(table.c.value, table.c.expires_at).where(table.c.key == key)).first()
+                if row is not None and row.expires_at > datetime.utcnow():
+                    with self._lock:
+                        self._touched[key] = datetime.utcnow()
+                    remaining = (row.expires_at - datetime.utcnow()).total_seconds()
+                    self._remember(key, row.value, now + remaining)
+                    self._count("db_hits")
+                    return row.value
+            except Exception as e:
+                logger.warning("Completion cache read failed: %s", e)
+        self._count("misses")
+        return None
+
+    def set(self, key: str, value: str):
+        if not value:
+            return
+        self._remember(key, value, time.time() + self.ttl_seconds)
+        self._count("stores")
+        if self.entry_model is None:
+            return
+        now = datetime.utcnow()
+        table = self.entry_model.__table__
+        values = {"value": value, "created_at": now, "last_used_at": now,
+                  "expires_at": now + timedelta(seconds=self.ttl_seconds)}
+        try:
+            with self.engine().begin() as conn:
+                if not conn.execute(table.update().where(table.c.key == key).values(**values)).rowcount:
+                    conn.execute(table.insert().values(key=key, **values))
+        except IntegrityError:
+            pass  # another process stored the same completion first
+        except Exception as e:
+            logger.warning("Completion cache write failed: %s", e)
+            return
+        with self._lock:
+            self._writes += 1
+            due = self._writes % self.evict_every == 0
+        if due:
+            self.evict()
+
+    def evict(self) -> int:
+        """Drop expired rows, then the least recently used rows above ``max_rows``."""
+        if self.entry_model is None:
+            return 0
+        table = self.entry_model.__table__
+        with self._lock:
+            touched, self._touched = self._touched, {}
+        try:
+            with self.engine().begin() as conn:
+                # Record recent DB-tier hits first so the LRU cut below sees them.
+                for key, used in touched.items():
+                    conn.execute(table.update().where(table.c.key == key, table.c.last_used_at < used)
+                                 .values(last_used_at=used))
+                removed = conn.execute(table.delete().where(table.c.expires_at <= datetime.utcnow())).rowcount
+                overflow = conn.execute(select(func.count()).select_from(table)).scalar() - self.max_rows
+                if overflow > 0:
+                    stale = [k for (k,) in conn.execute(select(table.c.key).order_by(table.c.last_used_at.asc()).limit(overflow))]
+                    removed += conn.execute(table.delete().where(table.c.key.in_(stale))).rowcount
+        except Exception as e:
+            logger.warning("Completion cache eviction failed: %s", e)
+            return 0
+        self._count("evictions", removed)
+        return removed
+
+    def clear_memory(self):
+        with self._lock:
+            self._lru.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["memory_entries"] = len(self._lru)
+        lookups = stats["memory_hits"] + stats["db_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["db_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
@@ -0,0 +1,212 @@
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from types import SimpleNamespace
+
+logger = logging.getLogger(__name__)
+
+STATE_PREFIX = "AI circuit open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling upstream while the breaker is open."""
+
+
+class AIDeadlineExceeded(TimeoutError):
+    """The call (all attempts together) ran past its deadline."""
+
+
+class AIQueueTimeout(AIDeadlineExceeded):
+    """The deadline passed while the call still waited for a local thread; upstream was never asked."""
+
+
+def is_retryable(error: Exception) -> bool:
+    # Timeouts, connection errors and 408/409/429/5xx are worth another try; other 4xx are caller bugs.
+    status = getattr(error, "status_code", None)
+    if status is None:
+        return True
+    return status in {408, 409, 429} or status >= 500
+
+
+class ResilientAIClient:
+    """Deadline, retry, circuit-breaker and hedging policy around a completion call.
+
+    ``create`` is any callable taking ``chat.completions.create`` keyword
+    arguments, resolved per call so tests can swap the underlying client. The
+    breaker state is mirrored to ``state_path`` (the dashboard's fallback
+    notice) when it trips and cleared again when it recovers.
+    """
+
+    def __init__(self, create, timeout: float = 20.0, retries: int = 2, backoff: float = 0.5,
+                 backoff_max: float = 4.0, failure_threshold: int = 5, reset_after: float = 30.0,
+                 hedge_after: float = 0.0, state_path: str = None, max_threads: int = 16,
+                 clock=time.monotonic, sleep=time.sleep, rng=None):
+        self.create = create
+        self.timeout = float(timeout)
+        self.retries = max(0, int(retries))
+        self.backoff = float(backoff)
+        self.backoff_max = float(backoff_max)
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_after = float(reset_after)
+        self.hedge_after = float(hedge_after or 0)
+        self.state_path = state_path
+        self.max_threads = max(2, int(max_threads))
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.complete))
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pool_pid = None
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._last_error = None
+        self.counters = {"calls": 0, "successes": 0, "failures": 0, "retries": 0,
+                         "hedges": 0, "short_circuits": 0, "timeouts": 0, "queue_timeouts": 0, "trips": 0}
+
+    # ── breaker ──────────────────────────────────────────────
+    def _admit(self):
+        with self._lock:
+            self.counters["calls"] += 1
+            if self._state == "open":
+                if self.clock() - self._opened_at < self.reset_after:
+                    self.counters["short_circuits"] += 1
+                    raise CircuitOpenError(f"{STATE_PREFIX}: {self._last_error}")
+                self._state = "half_open"
+            if self._state == "half_open":
+                # Only one probe at a time while deciding whether upstream recovered.
+                if self._probe_in_flight:
+                    self.counters["short_circuits"] += 1
+                    raise CircuitOpenError(f"{STATE_PREFIX}: probing upstream")
+                self._probe_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            recovered = self._state != "closed"
+            self.counters["successes"] += 1
+            self._state, self._failures, self._probe_in_flight = "closed", 0, False
+        if recovered:
+            logger.info("AI circuit closed")
+            self._clear_state_file()
+
+    def record_failure(self, error: Exception):
+        with self._lock:
+            self.counters["failures"] += 1
+            self._failures += 1
+            self._last_error = f"{type(error).__name__}: {error}"[:200]
+            trip = self._state == "half_open" or self._failures >= self.failure_threshold
+            self._probe_in_flight = False
+            if trip and self._state != "open":
+                self._state, self._opened_at = "open", self.clock()
+                self.counters["trips"] += 1
+            else:
+                trip = False
+        if trip:
+            logger.warning("AI circuit opened after %s failures: %s", self._failures, self._last_error)
+            self._write_state_file()
+
+    def _release_probe(self):
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _write_state_file(self):
+        if not self.state_path:
+            return
+        try:
+            with open(self.state_path, "w", encoding="utf-8") as f:
+                f.write(f"{STATE_PREFIX} after {self._failures} failures ({self._last_error})")
+        except OSError as e:
+            logger.warning("Could not record AI circuit state: %s", e)
+
+    def _clear_state_file(self):
+        if not self.state_path:
+            return
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                ours = f.read().startswith(STATE_PREFIX)
+            if ours:
+                os.remove(self.state_path)
+        except OSError:
+            pass
+
+    def state(self) -> dict:
+        with self._lock:
+            return {"state": self._state, "consecutive_failures": self._failures,
+                    "last_error": self._last_error, **self.counters}
+
+    # ── calls ────────────────────────────────────────────────
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ThreadPoolExecutor(max_workers=self.max_threads, thread_name_prefix="ai-call")
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def _attempt(self, kwargs: dict, deadline: float):
+        pool = self._executor()
+        futures = {pool.submit(self.create, **kwargs)}
+        hedge_at = self.clock() + self.hedge_after if self.hedge_after else None
+        last_error = None
+        while futures:
+            now = self.clock()
+            if now >= deadline:
+                break
+            until = min(deadline, hedge_at) if hedge_at else deadline
+            done, futures = wait(futures, timeout=max(0.0, until - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except Exception as e:
+                    last_error = e
+            if hedge_at and self.clock() >= hedge_at and futures:
+                # Primary is slow: race a duplicate request and take whichever answers first.
+                hedge_at = None
+                with self._lock:
+                    self.counters["hedges"] += 1
+                futures.add(pool.submit(self.create, **kwargs))
+        if last_error is not None and not futures:
+            raise last_error
+        # Drop attempts still queued for a thread so they do not reach upstream after we gave up.
+        cancelled = [future.cancel() for future in futures]
+        if cancelled and all(cancelled) and last_error is None:
+            with self._lock:
+                self.counters["queue_timeouts"] += 1
+            raise AIQueueTimeout(f"AI call waited {self.timeout:.1f}s for a free thread")
+        with self._lock:
+            self.counters["timeouts"] += 1
+        raise AIDeadlineExceeded(f"AI call exceeded {self.timeout:.1f}s deadline")
+
+    def complete(self, **kwargs):
+        """``chat.completions.create`` with the policy applied. Raises on final failure."""
+        self._admit()
+        deadline = self.clock() + self.timeout
+        attempt = 0
+        while True:
+            try:
+                result = self._attempt(kwargs, deadline)
+            except AIQueueTimeout:
+                # Local saturation says nothing about upstream health, so the breaker is not charged.
+                self._release_probe()
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    self._release_probe()
+                    raise
+                self.record_failure(e)
+                with self._lock:
+                    tripped = self._state == "open"
+                delay = min(self.backoff_max, self.backoff * (2 ** attempt)) * self.rng.random()
+                if tripped or attempt >= self.retries or self.clock() + delay >= deadline:
+                    raise
+                with self._lock:
+                    self.counters["retries"] += 1
+                self.sleep(delay)
+                attempt += 1
+                continue
+            self.record_success()
+            return result
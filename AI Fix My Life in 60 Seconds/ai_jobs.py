@@ -0,0 +1,85 @@
+import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class FixJobQueue:
+    """Bounded worker pool that runs AI fix jobs outside the request cycle.
+
+    Jobs live in the database; the pool only receives job ids. ``runner`` is
+    called with a job id inside an application context and owns all DB work,
+    so the queue itself stays free of model imports.
+
+    Pending jobs are kept per owner (the user who asked for the fix) and
+    workers take them round-robin across owners, so a user with a hundred
+    queued fixes delays someone else's single fix by at most one job.
+    """
+
+    def __init__(self, app=None, runner=None, max_workers: int = 4, eager: bool = False):
+        self.app = None
+        self.runner = runner
+        self.max_workers = max(1, int(max_workers))
+        self.eager = eager
+        self._executor = None
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, runner)
+
+    def init_app(self, app, runner=None):
+        self.app = app
+        if runner is not None:
+            self.runner = runner
+        app.extensions["fix_job_queue"] = self
+
+    def _pool(self) -> ThreadPoolExecutor:
+        # Created on first submit so forked gunicorn workers each get their own threads.
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="fix-job"
+                )
+            return self._executor
+
+    def submit(self, job_id: int, owner=None):
+        if self.eager:
+            self._run(job_id)
+            return None
+        with self._lock:
+            self._pending.setdefault(owner, deque()).append(job_id)
+        # One pool task per job; each task picks whichever job is fairest when it starts.
+        return self._pool().submit(self._run_next)
+
+    def _run_next(self):
+        with self._lock:
+            owner, jobs = next(iter(self._pending.items()))
+            job_id = jobs.popleft()
+            if jobs:
+                self._pending.move_to_end(owner)
+            else:
+                del self._pending[owner]
+        self._run(job_id)
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(len(jobs) for jobs in self._pending.values())
+
+    def _run(self, job_id: int):
+        if self.app is None or self.runner is None:
+            logger.warning("Fix job %s dropped: queue not initialised", job_id)
+            return
+        with self.app.app_context():
+            try:
+                self.runner(job_id)
+            except Exception:
+                logger.exception("Fix job %s crashed", job_id)
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        # Outside the lock: queued pool tasks still need it to pick their job.
+        if executor is not None:
+            executor.shutdown(wait=wait)
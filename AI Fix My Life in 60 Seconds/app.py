@@ -1,42 +1,64 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file
+from flask import Flask, Response, before_render_template, g, has_request_context, make_response, render_template, request, redirect, session, url_for, flash, jsonify, stream_with_context, template_rendered
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import make_transient_to_detached
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
-from flask_wtf.csrf import CSRFProtect
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask_wtf.csrf import CSRFProtect, generate_csrf
+from markupsafe import Markup
+from werkzeug.middleware.proxy_fix import ProxyFix
 from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from pathlib import Path
-import json, os, secrets, io, logging, zipfile
+from urllib.parse import urlsplit
+import functools, gc, hashlib, importlib.util, json, math, os, re, secrets, logging, sqlite3, threading, time
+import click
 from dotenv import load_dotenv
-import sys
-import os
-sys.path.append(os.path.dirname(__file__))
+from ai_jobs import FixJobQueue
+from ai_cache import CompletionCache, completion_key
+from search import SearchIndex
+from ai_async import AsyncAIRunner
+from ai_client import ResilientAIClient
+from project_export import CompressedEntryCache, SQLITE_SIDE_FILES, iter_project_zip
+from db_profile import apply_pragmas, engine_options, sqlite_pragmas
+from metrics import Registry, SlowRequestProfiler
+from rate_limit import DailyQuota, MemoryBucketStore, QuotaExceeded, RateLimiter, RedisBucketStore
+from mail_outbox import MailOutbox, SMTPSender, retry_delay
+from identity_cache import REDIS_OK, IdentityCache, RedisIdentityBackend
+from passwords import DEFAULT_METHOD as DEFAULT_PASSWORD_HASH, PasswordHasher
+from render_cache import CSRF_PLACEHOLDER, INDEX_PLACEHOLDER, FragmentCache, make_etag
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 PLACEHOLDER_VALUES = {"", "your-key-here", "your-email@example.com", "your-email-password"}
+FALLBACK_REASON_FILE = "ai-fallback-reason.txt"
+AI_TIMEOUT_SECONDS = float(os.getenv("AI_TIMEOUT_SECONDS", "20"))
 
-try:
-    from flask_mail import Mail, Message
-    MAIL_IMPORT_OK = True
-except Exception:
-    Mail = None
-    Message = None
-    MAIL_IMPORT_OK = False
-    logger.warning("Flask-Mail not installed - email sending disabled")
-
-AI_CLIENT = None
-AI_ENABLED = False
 raw_openai_key = (os.getenv("OPENAI_API_KEY") or "").strip()
 OPENAI_KEY = "" if raw_openai_key.lower() in PLACEHOLDER_VALUES else raw_openai_key
-if OPENAI_KEY:
-    try:
-        from openai import OpenAI
-        AI_CLIENT = OpenAI(api_key=OPENAI_KEY)
-        AI_ENABLED = True
-    except Exception as e:
-        logger.warning("OpenAI client unavailable: %s", e)
+# The SDK import alone costs ~0.5 s and ~25 MB, so the client is built on first use (or before fork, see prefork()).
+AI_CLIENT = None
+AI_ENABLED = bool(OPENAI_KEY) and importlib.util.find_spec("openai") is not None
+_ai_client_lock = threading.Lock()
+
+def _ai_client():
+    """The shared OpenAI client, built on first use; None when AI is off or the SDK fails to load."""
+    global AI_CLIENT, AI_ENABLED
+    if AI_CLIENT is None and AI_ENABLED:
+        with _ai_client_lock:
+            if AI_CLIENT is None and AI_ENABLED:
+                try:
+                    from openai import OpenAI
+                    # Retries and deadlines are owned by ai_resilient, not the SDK.
+                    AI_CLIENT = OpenAI(api_key=OPENAI_KEY, timeout=AI_TIMEOUT_SECONDS, max_retries=0)
+                except Exception as e:
+                    logger.warning("OpenAI client unavailable: %s", e)
+                    AI_ENABLED = False
+    return AI_CLIENT
+
+def _ai_ready() -> bool:
+    return AI_ENABLED and _ai_client() is not None
 
 app = Flask(__name__)
 secret_key = os.getenv("SECRET_KEY", "flask_default_secret_key_123456789abc")
@@ -44,30 +66,124 @@ app.secret_key = secret_key
 
 app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL", "sqlite:///app.db")
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+# "production" tunes the pool (server DBs) or WAL and lock waits (SQLite); "default" leaves SQLAlchemy's settings.
+app.config["DB_PROFILE"] = os.getenv("DB_PROFILE", "production").strip().lower()
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config["SQLALCHEMY_DATABASE_URI"], app.config["DB_PROFILE"])
+app.config["SQLITE_PRAGMAS"] = sqlite_pragmas(app.config["DB_PROFILE"])
 app.config["SESSION_COOKIE_HTTPONLY"] = True
 app.config["SESSION_COOKIE_SAMESITE"] = "Lax"
-app.config["TEMPLATES_AUTO_RELOAD"] = True
+# Production render mode by default: templates are compiled once and never re-stat'ed.
+app.config["TEMPLATES_AUTO_RELOAD"] = os.getenv("TEMPLATES_AUTO_RELOAD", os.getenv("FLASK_DEBUG", "false")).strip().lower() in {"1", "true", "yes", "on"}
 app.config["REMEMBER_COOKIE_DURATION"] = timedelta(days=30)
 app.config["PERMANENT_SESSION_LIFETIME"] = timedelta(days=7)
 app.config["MAIL_SERVER"] = os.getenv("MAIL_SERVER", "")
 app.config["MAIL_PORT"] = int(os.getenv("MAIL_PORT", "587"))
 app.config["MAIL_USE_TLS"] = os.getenv("MAIL_USE_TLS", "true").lower() == "true"
+app.config["MAIL_USE_SSL"] = os.getenv("MAIL_USE_SSL", "false").strip().lower() in {"1", "true", "yes", "on"}
+app.config["MAIL_TIMEOUT_SECONDS"] = float(os.getenv("MAIL_TIMEOUT_SECONDS", "10"))
+app.config["MAIL_OUTBOX_BATCH_SIZE"] = int(os.getenv("MAIL_OUTBOX_BATCH_SIZE", "20"))
+app.config["MAIL_OUTBOX_POLL_SECONDS"] = float(os.getenv("MAIL_OUTBOX_POLL_SECONDS", "5"))
+app.config["MAIL_MAX_ATTEMPTS"] = int(os.getenv("MAIL_MAX_ATTEMPTS", "6"))
+app.config["MAIL_RETRY_BACKOFF_SECONDS"] = float(os.getenv("MAIL_RETRY_BACKOFF_SECONDS", "30"))
 raw_mail_username = (os.getenv("MAIL_USERNAME", "") or "").strip()
 raw_mail_password = (os.getenv("MAIL_PASSWORD", "") or "").strip()
 raw_mail_sender = (os.getenv("MAIL_DEFAULT_SENDER", raw_mail_username) or "").strip()
 app.config["MAIL_USERNAME"] = "" if raw_mail_username.lower() in PLACEHOLDER_VALUES else raw_mail_username
 app.config["MAIL_PASSWORD"] = "" if raw_mail_password.lower() in PLACEHOLDER_VALUES else raw_mail_password
 app.config["MAIL_DEFAULT_SENDER"] = "" if raw_mail_sender.lower() in PLACEHOLDER_VALUES else raw_mail_sender
-app.jinja_env.auto_reload = True
+app.jinja_env.auto_reload = app.config["TEMPLATES_AUTO_RELOAD"]
 EMAIL_VERIFICATION_REQUIRED = os.getenv("REQUIRE_EMAIL_VERIFICATION", "false").strip().lower() in {"1", "true", "yes", "on"}
+app.config["AI_JOB_WORKERS"] = int(os.getenv("AI_JOB_WORKERS", "4"))
+app.config["AI_JOBS_EAGER"] = os.getenv("AI_JOBS_EAGER", "false").strip().lower() in {"1", "true", "yes", "on"}
+# A job still "running" after this long lost its worker (gunicorn timeout, deploy) and may be run again.
+app.config["AI_JOB_LEASE_SECONDS"] = int(os.getenv("AI_JOB_LEASE_SECONDS", "120"))
+app.config["AI_CACHE_MAX_ENTRIES"] = int(os.getenv("AI_CACHE_MAX_ENTRIES", "512"))
+app.config["AI_CACHE_TTL_SECONDS"] = int(os.getenv("AI_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+app.config["AI_CACHE_MAX_ROWS"] = int(os.getenv("AI_CACHE_MAX_ROWS", "20000"))
+app.config["DASHBOARD_PAGE_SIZE"] = int(os.getenv("DASHBOARD_PAGE_SIZE", "24"))
+app.config["SEARCH_PAGE_SIZE"] = int(os.getenv("SEARCH_PAGE_SIZE", "20"))
+app.config["BULLETS_BATCH_MAX"] = int(os.getenv("BULLETS_BATCH_MAX", "10"))
+app.config["BULLETS_BATCH_WORKERS"] = int(os.getenv("BULLETS_BATCH_WORKERS", "4"))
+app.config["AI_ASYNC"] = os.getenv("AI_ASYNC", "false").strip().lower() in {"1", "true", "yes", "on"}
+app.config["AI_MAX_CONCURRENCY"] = int(os.getenv("AI_MAX_CONCURRENCY", "32"))
+app.config["AI_MAX_KEEPALIVE"] = int(os.getenv("AI_MAX_KEEPALIVE", "20"))
+# Threads that carry AI calls per worker; keep it at least the gthread --threads count.
+app.config["AI_CALL_THREADS"] = int(os.getenv("AI_CALL_THREADS", str(app.config["AI_MAX_CONCURRENCY"])))
+app.config["EXPORT_ROOT"] = os.getenv("EXPORT_ROOT", "")
+app.config["EXPORT_DATABASE"] = os.getenv("EXPORT_DATABASE", "exclude").strip().lower()
+app.config["PASSWORD_HASH_METHOD"] = os.getenv("PASSWORD_HASH_METHOD", DEFAULT_PASSWORD_HASH)
+app.config["PASSWORD_HASH_WORKERS"] = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+app.config["PASSWORD_HASH_POOL"] = os.getenv("PASSWORD_HASH_POOL", "thread").strip().lower()
+app.config["IDENTITY_CACHE_TTL_SECONDS"] = float(os.getenv("IDENTITY_CACHE_TTL_SECONDS", "30"))
+app.config["IDENTITY_CACHE_MAX_ENTRIES"] = int(os.getenv("IDENTITY_CACHE_MAX_ENTRIES", "10000"))
+app.config["IDENTITY_CACHE_URL"] = os.getenv("IDENTITY_CACHE_URL", "")
+app.config["QUERY_COUNT_HEADER"] = os.getenv("QUERY_COUNT_HEADER", "false").strip().lower() in {"1", "true", "yes", "on"}
+app.config["METRICS_TOKEN"] = os.getenv("METRICS_TOKEN", "")
+# /metrics is only served with a scrape token: open, it leaks traffic data and costs a DB query per hit.
+app.config["METRICS_ENABLED"] = bool(app.config["METRICS_TOKEN"]) and os.getenv("METRICS_ENABLED", "true").strip().lower() in {"1", "true", "yes", "on"}
+app.config["PROFILE_SLOW_REQUESTS_MS"] = float(os.getenv("PROFILE_SLOW_REQUESTS_MS", "0"))
+app.config["PROFILE_INTERVAL_MS"] = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+app.config["RATE_LIMIT_ENABLED"] = os.getenv("RATE_LIMIT_ENABLED", "true").strip().lower() in {"1", "true", "yes", "on"}
+app.config["RATE_LIMIT_URL"] = os.getenv("RATE_LIMIT_URL", "")
+# Reverse proxies in front of the app (Render, Railway, Heroku: 1). Without it every client
+# shares the proxy's address and the per-IP limits become site-wide; 0 when exposed directly.
+app.config["TRUSTED_PROXY_HOPS"] = int(os.getenv("TRUSTED_PROXY_HOPS", "1"))
+# Token buckets as "<count>/<second|minute|hour|day>"; an empty value turns the rule off.
+app.config["RATE_LIMITS"] = {
+    "ip": os.getenv("RATE_LIMIT_IP", "600/minute"),      # every request, per client IP
+    "auth": os.getenv("RATE_LIMIT_AUTH", "10/minute"),   # login, signup and password forms, per IP
+    "mail": os.getenv("RATE_LIMIT_MAIL", "5/hour"),      # verification and reset mails, per IP and per address
+    "save": os.getenv("RATE_LIMIT_SAVE", "60/minute"),   # item saves, per user
+    "ai": os.getenv("RATE_LIMIT_AI", "20/minute"),       # AI generations, per user
+}
+# Daily LLM tokens per user; past it, fixes and bullets come from the local templates. 0 = unlimited.
+app.config["AI_DAILY_TOKEN_QUOTA"] = int(os.getenv("AI_DAILY_TOKEN_QUOTA", "200000"))
+app.config["FRAGMENT_CACHE_MAX_ENTRIES"] = int(os.getenv("FRAGMENT_CACHE_MAX_ENTRIES", "5000"))
+app.config["EXPORT_CACHE_DIR"] = os.getenv("EXPORT_CACHE_DIR", os.path.join(app.instance_path, "export-cache"))
+
+if app.config["TRUSTED_PROXY_HOPS"]:
+    hops = app.config["TRUSTED_PROXY_HOPS"]
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
 
 db = SQLAlchemy(app)
 csrf = CSRFProtect(app)
-mail = Mail(app) if MAIL_IMPORT_OK and Mail is not None else None
 login_manager = LoginManager()
 login_manager.login_view = "login"
 login_manager.init_app(app)
 serializer = URLSafeTimedSerializer(app.secret_key)
+passwords = PasswordHasher(app.config["PASSWORD_HASH_METHOD"], app.config["PASSWORD_HASH_WORKERS"], app.config["PASSWORD_HASH_POOL"])
+fix_jobs = FixJobQueue(max_workers=app.config["AI_JOB_WORKERS"], eager=app.config["AI_JOBS_EAGER"])
+
+def _async_ai_client():
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+    import httpx
+    limits = httpx.Limits(
+        max_connections=app.config["AI_MAX_CONCURRENCY"],
+        max_keepalive_connections=app.config["AI_MAX_KEEPALIVE"],
+        keepalive_expiry=60,
+    )
+    return AsyncOpenAI(api_key=OPENAI_KEY, timeout=AI_TIMEOUT_SECONDS, max_retries=0,
+                       http_client=DefaultAsyncHttpxClient(limits=limits))
+
+async_ai = AsyncAIRunner(_async_ai_client, app.config["AI_MAX_CONCURRENCY"]) if app.config["AI_ASYNC"] and AI_ENABLED else None
+
+def _ai_create(**kwargs):
+    # Resolved per call so a swapped-in AI_CLIENT (tests, benchmarks) is picked up.
+    if async_ai is not None and not kwargs.get("stream"):
+        return async_ai.chat_completion(**kwargs)
+    return _ai_client().chat.completions.create(**kwargs)
+
+ai_resilient = ResilientAIClient(
+    _ai_create,
+    timeout=AI_TIMEOUT_SECONDS,
+    retries=int(os.getenv("AI_RETRIES", "2")),
+    backoff=float(os.getenv("AI_RETRY_BACKOFF_SECONDS", "0.5")),
+    failure_threshold=int(os.getenv("AI_BREAKER_THRESHOLD", "5")),
+    reset_after=float(os.getenv("AI_BREAKER_RESET_SECONDS", "30")),
+    hedge_after=float(os.getenv("AI_HEDGE_AFTER_SECONDS", "0")),
+    state_path=FALLBACK_REASON_FILE,
+    max_threads=max(app.config["AI_CALL_THREADS"], app.config["AI_MAX_CONCURRENCY"]),
+)
 
 # ── MODELS ──────────────────────────────────────────────────
 class User(UserMixin, db.Model):
@@ -80,16 +196,331 @@ class User(UserMixin, db.Model):
     items      = db.relationship("Item", backref="user", lazy=True, cascade="all, delete-orphan")
 
 class Item(db.Model):
-    id         = db.Column(db.Integer, primary_key=True)
-    title      = db.Column(db.String(100), nullable=False)
-    data       = db.Column(db.Text, nullable=False, default="{}")
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    user_id    = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    id           = db.Column(db.Integer, primary_key=True)
+    title        = db.Column(db.String(100), nullable=False)
+    content      = db.Column(db.Text, nullable=False, default="")
+    ai_fix       = db.Column(db.Text)
+    fix_status   = db.Column(db.String(20), nullable=False, default="none")  # none | pending | ready | failed
+    fix_source   = db.Column(db.String(20))  # ai | local | legacy
+    content_hash = db.Column(db.String(64), index=True)
+    data         = db.Column(db.Text, nullable=False, default="{}")  # extra form fields only
+    created_at   = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at   = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    user_id      = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    fix_jobs     = db.relationship("FixJob", backref="item", lazy=True, cascade="all, delete-orphan")
+
+    # Serves the dashboard's keyset pagination: WHERE user_id = ? ORDER BY updated_at DESC, id DESC.
+    __table_args__ = (db.Index("ix_item_user_updated", "user_id", "updated_at", "id"),)
+
+class FixJob(db.Model):
+    id          = db.Column(db.Integer, primary_key=True)
+    item_id     = db.Column(db.Integer, db.ForeignKey("item.id", ondelete="CASCADE"), nullable=False, index=True)
+    status      = db.Column(db.String(20), nullable=False, default="queued", index=True)
+    source      = db.Column(db.String(20))
+    error       = db.Column(db.String(300))
+    created_at  = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at  = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    queue_ms    = db.Column(db.Integer)
+    run_ms      = db.Column(db.Integer)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "item_id": self.item_id,
+            "status": self.status,
+            "source": self.source,
+            "error": self.error,
+            "queue_ms": self.queue_ms,
+            "run_ms": self.run_ms,
+        }
+
+class OutboxMail(db.Model):
+    __tablename__ = "outbox_mail"
+    __table_args__ = (db.Index("ix_outbox_mail_due", "status", "next_attempt_at"),)
+    id              = db.Column(db.Integer, primary_key=True)
+    to_email        = db.Column(db.String(120), nullable=False)
+    subject         = db.Column(db.String(200), nullable=False)
+    body            = db.Column(db.Text, nullable=False)
+    status          = db.Column(db.String(20), nullable=False, default="queued")
+    attempts        = db.Column(db.Integer, nullable=False, default=0)
+    last_error      = db.Column(db.String(300))
+    claim_token     = db.Column(db.String(32))
+    created_at      = db.Column(db.DateTime, default=datetime.utcnow)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at         = db.Column(db.DateTime)
+
+class CompletionCacheEntry(db.Model):
+    key          = db.Column(db.String(64), primary_key=True)
+    value        = db.Column(db.Text, nullable=False)
+    created_at   = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at   = db.Column(db.DateTime, nullable=False, index=True)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+completion_cache = CompletionCache(
+    entry_model=CompletionCacheEntry,
+    engine=lambda: db.engine,
+    max_entries=app.config["AI_CACHE_MAX_ENTRIES"],
+    ttl_seconds=app.config["AI_CACHE_TTL_SECONDS"],
+    max_rows=app.config["AI_CACHE_MAX_ROWS"],
+)
+
+# ── SEARCH INDEX ─────────────────────────────────────────────
+search_index = SearchIndex()
+
+@db.event.listens_for(Item, "after_insert")
+@db.event.listens_for(Item, "after_update")
+def _index_item(mapper, connection, target):
+    search_index.index_ids(connection, [target.id])
+
+@db.event.listens_for(Item, "after_delete")
+def _unindex_item(mapper, connection, target):
+    search_index.delete(connection, target.id)
+
+@db.event.listens_for(db.metadata, "after_create")
+def _create_search_index(target, connection, **kw):
+    search_index.create(connection)
+
+@db.event.listens_for(db.metadata, "before_drop")
+def _drop_search_index(target, connection, **kw):
+    search_index.drop(connection)
+
+# ── IDENTITY CACHE ───────────────────────────────────────────
+def _identity_backend():
+    url = app.config["IDENTITY_CACHE_URL"]
+    if not url:
+        return None
+    if not REDIS_OK:
+        logger.warning("IDENTITY_CACHE_URL set but redis is not installed; identity cache stays per-process")
+        return None
+    return RedisIdentityBackend(url)
+
+identity_cache = IdentityCache(
+    ttl_seconds=app.config["IDENTITY_CACHE_TTL_SECONDS"],
+    max_entries=app.config["IDENTITY_CACHE_MAX_ENTRIES"],
+    backend=_identity_backend(),
+)
+IDENTITY_FIELDS = ("id", "username", "email", "is_verified")
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    uid = int(user_id)
+    snapshot, version = identity_cache.lookup(uid)
+    if snapshot is not None:
+        # Attach without a SELECT; columns left out of the snapshot (password) load lazily if touched.
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+    user = db.session.get(User, uid)
+    if user is not None:
+        identity_cache.store(uid, {field: getattr(user, field) for field in IDENTITY_FIELDS}, version)
+    return user
+
+@db.event.listens_for(User, "after_update")
+@db.event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target):
+    # Verification, password resets and deletions all flush through here. Invalidate now,
+    # and again after commit so a read racing the transaction cannot re-cache old values.
+    identity_cache.invalidate(target.id)
+    db.session.info.setdefault("identity_dirty", set()).add(target.id)
+
+@db.event.listens_for(db.session, "after_commit")
+def _invalidate_committed_users(session):
+    for uid in session.info.pop("identity_dirty", ()):
+        identity_cache.invalidate(uid)
+
+@db.event.listens_for(db.session, "after_rollback")
+def _forget_dirty_users(session):
+    session.info.pop("identity_dirty", None)
+
+# ── DB PROFILE ───────────────────────────────────────────────
+@db.event.listens_for(Engine, "connect")
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection) and app.config["SQLITE_PRAGMAS"]:
+        apply_pragmas(dbapi_connection, app.config["SQLITE_PRAGMAS"])
+
+# ── METRICS ──────────────────────────────────────────────────
+metrics = Registry()
+REQUEST_LATENCY = metrics.histogram("http_request_duration_seconds", "Request latency by endpoint.", ("endpoint", "method", "status"))
+SQL_LATENCY = metrics.histogram("db_query_duration_seconds", "SQL statement latency by verb.", ("operation",),
+                                buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0))
+COMMIT_LATENCY = metrics.histogram("db_commit_duration_seconds", "Session commit latency, flush included.")
+TEMPLATE_LATENCY = metrics.histogram("template_render_duration_seconds", "Template render time.", ("template",),
+                                     buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25))
+LLM_LATENCY = metrics.histogram("llm_request_duration_seconds", "Upstream completion latency, retries included.", ("kind", "outcome"))
+LLM_TOKENS = metrics.counter("llm_tokens_total", "Tokens reported by the completion API.", ("type",))
+AI_RESULTS = metrics.counter("ai_results_total", "Fixes and bullets served, by source; local is the fallback.", ("kind", "source"))
+EXPORT_LATENCY = metrics.histogram("export_duration_seconds", "Full /project/export.zip stream time.",
+                                   buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0))
+EXPORT_BYTES = metrics.counter("export_bytes_total", "Bytes streamed by /project/export.zip.")
+SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "PRAGMA", "CREATE", "WITH"}
+slow_profiler = (SlowRequestProfiler(app.config["PROFILE_SLOW_REQUESTS_MS"] / 1000, app.config["PROFILE_INTERVAL_MS"] / 1000)
+                 if app.config["PROFILE_SLOW_REQUESTS_MS"] > 0 else None)
+
+def _record_llm(kind: str, started: float, outcome: str, usage=None):
+    LLM_LATENCY.observe(time.perf_counter() - started, kind, outcome)
+    if usage is not None:
+        LLM_TOKENS.inc("prompt", amount=getattr(usage, "prompt_tokens", 0) or 0)
+        LLM_TOKENS.inc("completion", amount=getattr(usage, "completion_tokens", 0) or 0)
+
+@db.event.listens_for(Engine, "before_cursor_execute")
+def _before_query(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+    if has_request_context():
+        g.sql_queries = g.get("sql_queries", 0) + 1
+
+@db.event.listens_for(Engine, "after_cursor_execute")
+def _after_query(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started")
+    if started:
+        verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+        SQL_LATENCY.observe(time.perf_counter() - started.pop(), verb if verb in SQL_OPERATIONS else "OTHER")
+
+@db.event.listens_for(Engine, "handle_error")
+def _drop_query_timer(context):
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+@db.event.listens_for(db.session, "before_commit")
+def _start_commit_timer(session):
+    session.info["commit_started"] = time.perf_counter()
+
+@db.event.listens_for(db.session, "after_commit")
+def _record_commit(session):
+    started = session.info.pop("commit_started", None)
+    if started is not None:
+        COMMIT_LATENCY.observe(time.perf_counter() - started)
+
+@before_render_template.connect_via(app)
+def _start_template_timer(sender, template, context, **extra):
+    g.setdefault("template_started", []).append(time.perf_counter())
+
+@template_rendered.connect_via(app)
+def _record_template(sender, template, context, **extra):
+    started = g.get("template_started")
+    if started:
+        TEMPLATE_LATENCY.observe(time.perf_counter() - started.pop(), template.name or "string")
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+    if slow_profiler is not None:
+        slow_profiler.start()
+
+@app.after_request
+def _record_request(response):
+    started = g.get("request_started")
+    if started is not None and app.config["METRICS_ENABLED"]:
+        REQUEST_LATENCY.observe(time.perf_counter() - started, request.endpoint or "unmatched", request.method, str(response.status_code))
+    if app.config["QUERY_COUNT_HEADER"]:
+        response.headers["X-Query-Count"] = str(g.get("sql_queries", 0))
+    return response
+
+@app.teardown_request
+def _stop_request_profiler(exc):
+    if slow_profiler is not None and "request_started" in g:
+        slow_profiler.stop(f"{request.method} {request.path}", time.perf_counter() - g.request_started)
+
+@metrics.collector
+def _runtime_metrics():
+    lookups = []
+    for name, stats in (("completion", completion_cache.stats()), ("card_fragment", card_fragments.stats()), ("identity", identity_cache.stats())):
+        hits = sum(stats.get(k, 0) for k in ("hits", "memory_hits", "db_hits", "shared_hits"))
+        lookups += [({"cache": name, "result": "hit"}, hits), ({"cache": name, "result": "miss"}, stats["misses"])]
+    breaker = ai_resilient.state()
+    outbox = (db.session.query(OutboxMail.status, db.func.count(OutboxMail.id))
+              .filter(OutboxMail.status != "sent").group_by(OutboxMail.status).all())
+    events = ("calls", "successes", "failures", "retries", "hedges", "short_circuits", "timeouts", "queue_timeouts", "trips")
+    return [
+        ("cache_lookups_total", "counter", "Cache lookups by result.", lookups),
+        ("ai_circuit_open", "gauge", "1 while the AI circuit breaker is open.", [({}, int(breaker["state"] == "open"))]),
+        ("ai_client_events_total", "counter", "Resilient AI client events.", [({"event": e}, breaker[e]) for e in events]),
+        ("rate_limit_decisions_total", "counter", "Token-bucket decisions by rule.",
+         [({"rule": rule, "result": result}, n) for rule, counts in limiter.stats().items() for result, n in counts.items()]),
+        ("ai_quota_exceeded_total", "counter", "AI calls served locally because the daily quota was spent.", [({}, ai_quota.exceeded)]),
+        ("fix_jobs_pending", "gauge", "Fix jobs waiting for a worker.", [({}, fix_jobs.pending())]),
+        ("mail_outbox_depth", "gauge", "Outbox mails not yet sent, by status.", [({"status": status}, n) for status, n in outbox]),
+    ]
+
+@app.route("/metrics")
+def metrics_endpoint():
+    if not app.config["METRICS_ENABLED"]:
+        return Response("metrics disabled\n", status=404, mimetype="text/plain")
+    token = app.config["METRICS_TOKEN"]
+    if not token or not secrets.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return Response("unauthorized\n", status=401, mimetype="text/plain")
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+# ── RATE LIMITS ──────────────────────────────────────────────
+def _rate_limit_store():
+    url = app.config["RATE_LIMIT_URL"]
+    if url and REDIS_OK:
+        return RedisBucketStore(url)
+    if url:
+        logger.warning("RATE_LIMIT_URL set but redis is not installed; rate limits stay per-process")
+    return MemoryBucketStore()
+
+rate_limit_store = _rate_limit_store()
+limiter = RateLimiter(rate_limit_store, app.config["RATE_LIMITS"], enabled=app.config["RATE_LIMIT_ENABLED"])
+ai_quota = DailyQuota(rate_limit_store, app.config["AI_DAILY_TOKEN_QUOTA"])
+
+def _limit_key(per: str) -> str:
+    if per == "user" and current_user.is_authenticated:
+        return f"user:{current_user.id}"
+    return f"ip:{request.remote_addr or 'unknown'}"
+
+def _back_url(fallback: str = None) -> str:
+    # Back to the page the form was on; a POST-only path would answer the browser's GET with 405.
+    referrer = request.referrer
+    if referrer and urlsplit(referrer).netloc == request.host:
+        return referrer
+    if request.url_rule is not None and "GET" in request.url_rule.methods:
+        return request.path
+    if fallback:
+        return url_for(fallback, **(request.view_args or {}))
+    return url_for("home")
+
+def _too_many_requests(retry_after: float, fallback: str = None):
+    message = f"Too many requests. Try again in {max(1, math.ceil(retry_after))} seconds."
+    if request.method == "POST" and not request.is_json and not request.path.startswith("/ai/"):
+        # Browser form posts: show the notice on the form instead of a bare error page.
+        flash(message, "error")
+        return redirect(_back_url(fallback))
+    response = jsonify({"error": message})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+def rate_limited(rule: str, per: str = "user", methods=None, fallback: str = None):
+    """Refuse the view with 429 once the caller's ``rule`` bucket is empty.
+
+    Limited form posts are redirected back to the referring page, or to the
+    ``fallback`` endpoint when the route itself cannot be fetched with GET.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapped(*args, **kwargs):
+            if methods is None or request.method in methods:
+                retry_after = limiter.hit(rule, _limit_key(per))
+                if retry_after:
+                    return _too_many_requests(retry_after, fallback)
+            return view(*args, **kwargs)
+        return wrapped
+    return decorator
+
+@app.before_request
+def _limit_per_ip():
+    if request.endpoint == "static":
+        return None
+    retry_after = limiter.hit("ip", _limit_key("ip"))
+    return _too_many_requests(retry_after) if retry_after else None
+
+def _usage_tokens(usage) -> int:
+    if usage is None:
+        return 0
+    total = getattr(usage, "total_tokens", None)
+    return total if total else (getattr(usage, "prompt_tokens", 0) or 0) + (getattr(usage, "completion_tokens", 0) or 0)
 
 def _token(kind: str, user_id: int) -> str:
     return serializer.dumps({"kind": kind, "uid": user_id})
@@ -104,23 +535,26 @@ def _verify_token(token: str, kind: str, max_age: int):
     uid = data.get("uid")
     if not uid:
         return None
-    return User.query.get(int(uid))
+    return db.session.get(User, int(uid))
+
+def _mail_configured() -> bool:
+    return bool(app.config.get("MAIL_SERVER") and app.config.get("MAIL_DEFAULT_SENDER"))
 
 def _send_mail(to_email: str, subject: str, body: str) -> bool:
-    if (not MAIL_IMPORT_OK) or (mail is None) or (Message is None):
-        logger.info("Mail library unavailable. Subject=%s Body=%s", subject, body)
-        return False
-    if not app.config.get("MAIL_SERVER") or not app.config.get("MAIL_DEFAULT_SENDER"):
+    """Queue a mail in the outbox; the background sender delivers it. Never blocks on SMTP."""
+    if not _mail_configured():
         logger.info("Mail not configured. Subject=%s Body=%s", subject, body)
         return False
     try:
-        msg = Message(subject=subject, recipients=[to_email], body=body)
-        mail.send(msg)
-        return True
+        db.session.add(OutboxMail(to_email=to_email, subject=subject[:200], body=body))
+        db.session.commit()
     except Exception as e:
-        logger.warning("Mail send failed: %s", e)
+        db.session.rollback()
+        logger.warning("Mail could not be queued: %s", e)
         logger.info("Mail fallback body: %s", body)
         return False
+    mail_outbox.wake()
+    return True
 
 def _local_60sec_fix(problem_text: str) -> str:
     return (
@@ -140,12 +574,476 @@ def _local_60sec_fix(problem_text: str) -> str:
         "- 100-150 min: Second focused sprint\n"
     )
 
+def _ai_fix_prompt(problem_text: str) -> str:
+    return (
+        "User problem:\n"
+        f"{problem_text}\n\n"
+        "You are a 60-second life coach. Return:\n"
+        "1) Quick situation analysis\n"
+        "2) 3-5 immediate actions\n"
+        "3) Short motivation line\n"
+        "4) Next 2-3 hour micro-plan\n"
+        "Tone: empathetic, clear, practical.\n"
+    )
+
+def _chat_completion(prompt: str, max_tokens: int, temperature: float = 0.7, user_id: int = None) -> str:
+    """Single-prompt completion through the response cache. Raises on API errors.
+
+    Cache hits are free; an upstream call is charged to ``user_id``'s daily
+    quota and raises ``QuotaExceeded`` once it is spent.
+    """
+    model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    key = completion_key(model, prompt, max_tokens, temperature)
+    cached = completion_cache.get(key)
+    if cached is not None:
+        return cached
+    ai_quota.check(user_id)
+    request_args = {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+    }
+    started = time.perf_counter()
+    try:
+        response = ai_resilient.complete(**request_args)
+    except Exception:
+        _record_llm("chat", started, "error")
+        raise
+    _record_llm("chat", started, "ok", getattr(response, "usage", None))
+    ai_quota.charge(user_id, _usage_tokens(getattr(response, "usage", None)))
+    text = (response.choices[0].message.content or "").strip()
+    completion_cache.set(key, text)
+    return text
+
+def _generate_fix(problem_text: str, user_id: int = None) -> tuple[str, str]:
+    """Return ``(fix_text, source)`` where source is ``"ai"`` or ``"local"``."""
+    if problem_text and _ai_ready():
+        try:
+            ai_fix = _chat_completion(_ai_fix_prompt(problem_text), max_tokens=450, user_id=user_id)
+            if ai_fix:
+                AI_RESULTS.inc("fix", "ai")
+                return ai_fix, "ai"
+        except QuotaExceeded as e:
+            logger.info("User %s: %s; using the local fix", user_id, e)
+        except Exception as e:
+            logger.warning("AI fix generation failed: %s", e)
+    AI_RESULTS.inc("fix", "local")
+    return _local_60sec_fix(problem_text), "local"
+
+def _content_hash(content: str) -> str:
+    return hashlib.sha256(" ".join((content or "").split()).encode("utf-8")).hexdigest()
+
+def _store_fix(item_id: int, content_hash: str, ai_fix: str, source: str, touch: bool = True) -> bool:
+    # Conditional on the hash so a fix for stale content never overwrites a newer edit.
+    values = {"ai_fix": ai_fix, "fix_status": "ready", "fix_source": source}
+    if not touch:
+        # Setting the column to itself stops the onupdate stamp, so a backfill keeps the dashboard order.
+        values["updated_at"] = Item.updated_at
+    stored = bool(Item.query.filter_by(id=item_id, content_hash=content_hash).update(values, synchronize_session=False))
+    if stored:
+        # Bulk UPDATEs bypass the mapper events, so refresh the search row here.
+        search_index.index_ids(db.session.connection(), [item_id])
+    return stored
+
+def _stream_fix_chunks(problem_text: str, user_id: int = None):
+    """Yield ``(delta, source)`` pieces of a fix, from the cache, a streamed completion or the local plan.
+
+    If the completion fails after some text was yielded, the error is re-raised
+    instead: the caller has already sent that text, so it must not be finished
+    with the local plan, cached, or saved as a fix.
+    """
+    if problem_text and _ai_ready():
+        model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        prompt = _ai_fix_prompt(problem_text)
+        key = completion_key(model, prompt, 450, 0.7)
+        cached = completion_cache.get(key)
+        if cached is not None:
+            AI_RESULTS.inc("fix", "ai")
+            for piece in re.findall(r"\S+\s*", cached):
+                yield piece, "ai"
+            return
+        parts, usage, completed = [], None, False
+        started = time.perf_counter()
+        try:
+            ai_quota.check(user_id)
+            stream = ai_resilient.complete(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=450,
+                temperature=0.7,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            for chunk in stream:
+                usage = getattr(chunk, "usage", None) or usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content or ""
+                if delta:
+                    parts.append(delta)
+                    yield delta, "ai"
+            completed = True
+            _record_llm("stream", started, "ok", usage)
+            ai_quota.charge(user_id, _usage_tokens(usage))
+        except QuotaExceeded as e:
+            logger.info("User %s: %s; streaming the local fix", user_id, e)
+        except Exception as e:
+            logger.warning("AI fix stream failed: %s", e)
+            _record_llm("stream", started, "error")
+            if parts:
+                # The breaker only saw the stream open; a mid-stream drop still counts against upstream.
+                ai_resilient.record_failure(e)
+                raise
+        if completed and parts:
+            AI_RESULTS.inc("fix", "ai")
+            completion_cache.set(key, "".join(parts).strip())
+            return
+    AI_RESULTS.inc("fix", "local")
+    for piece in re.findall(r"\S+\s*", _local_60sec_fix(problem_text)):
+        yield piece, "local"
+
+def _bullets_prompt(section: str, context: str) -> str:
+    return (
+        "You are a professional resume writer.\n"
+        "Generate 3-4 strong, ATS-optimized bullet points.\n"
+        f"Section: {section}\n"
+        f"Context: {context}\n"
+        "Rules:\n"
+        "- Start each bullet with a strong action verb\n"
+        "- Include metrics where possible\n"
+        "- Keep each bullet under 120 characters\n"
+        "Return ONLY bullets, one per line, starting with •"
+    )
+
+def _parse_bullets(text: str) -> list:
+    bullets = [line.strip() for line in text.split("\n") if line.strip().startswith("•")]
+    if not bullets:
+        bullets = [line.strip() for line in text.split("\n") if line.strip()]
+    return bullets
+
+def _local_bullets(section: str, context: str) -> list:
+    summary = " ".join(context.split())[:90]
+    return [
+        f"• Delivered {summary}",
+        f"• Owned {section.lower()} work end to end, from planning to follow-up",
+        "• Collaborated with stakeholders to ship results on schedule",
+    ]
+
+def _bullets_one(section: str, context: str, user_id: int = None) -> tuple[list, str, str]:
+    """Return ``(bullets, source, error)``; AI failures degrade to the local template."""
+    if not _ai_ready():
+        AI_RESULTS.inc("bullets", "local")
+        return _local_bullets(section, context), "local", None
+    # Pool threads need their own app context for the completion cache's DB tier.
+    with app.app_context():
+        try:
+            bullets = _parse_bullets(_chat_completion(_bullets_prompt(section, context), max_tokens=300, user_id=user_id))
+            AI_RESULTS.inc("bullets", "ai")
+            return bullets, "ai", None
+        except QuotaExceeded:
+            AI_RESULTS.inc("bullets", "local")
+            return _local_bullets(section, context), "local", "Daily AI quota reached; showing a template"
+        except Exception as e:
+            logger.warning("AI bullets failed for section %r: %s", section, e)
+            AI_RESULTS.inc("bullets", "local")
+            return _local_bullets(section, context), "local", "AI generation failed; showing a template"
+
+def _sse(payload: dict, event: str = None) -> str:
+    head = f"event: {event}\n" if event else ""
+    return f"{head}data: {json.dumps(payload)}\n\n"
+
+# ── AI FIX JOBS ──────────────────────────────────────────────
+def _add_fix_job(item: Item) -> FixJob:
+    # Added to the caller's session; submit to the pool only after the caller commits.
+    item.fix_status = "pending"
+    job = FixJob(item=item)
+    db.session.add(job)
+    return job
+
+def _run_fix_job(job_id: int):
+    # Claim with a conditional UPDATE so a job resumed by several workers runs once.
+    started = datetime.utcnow()
+    claimed = FixJob.query.filter_by(id=job_id, status="queued").update(
+        {"status": "running", "started_at": started}, synchronize_session=False
+    )
+    db.session.commit()
+    if not claimed:
+        return
+    job = db.session.query(FixJob.item_id, FixJob.created_at).filter_by(id=job_id).first()
+    if job is None:
+        return
+    item = db.session.get(Item, job.item_id)
+    # Copy what the call needs (the hash it is generated for: the item may be
+    # edited meanwhile), then end the transaction so no lock or pooled
+    # connection is held while the model runs.
+    snapshot = item and (item.content.strip(), item.content_hash, item.user_id)
+    db.session.rollback()
+    result = {"queue_ms": int((started - job.created_at).total_seconds() * 1000)}
+    try:
+        if snapshot is None:
+            raise LookupError("item deleted before fix was generated")
+        problem_text, content_hash, user_id = snapshot
+        ai_fix, source = _generate_fix(problem_text, user_id)
+        stored = _store_fix(job.item_id, content_hash, ai_fix, source)
+        result.update(status="done" if stored else "stale", source=source)
+    except Exception as e:
+        db.session.rollback()
+        logger.warning("Fix job %s failed: %s", job_id, e)
+        result.update(status="failed", error=str(e)[:300])
+        Item.query.filter_by(id=job.item_id, fix_status="pending").update({"fix_status": "failed"}, synchronize_session=False)
+    result["finished_at"] = datetime.utcnow()
+    result["run_ms"] = int((result["finished_at"] - started).total_seconds() * 1000)
+    FixJob.query.filter_by(id=job_id).update(result, synchronize_session=False)
+    db.session.commit()
+    logger.info("Fix job %s %s queue_ms=%s run_ms=%s source=%s",
+                job_id, result["status"], result["queue_ms"], result["run_ms"], result.get("source"))
+
+def _stale_before() -> datetime:
+    return datetime.utcnow() - timedelta(seconds=app.config["AI_JOB_LEASE_SECONDS"])
+
+def _job_in_flight(job: FixJob) -> bool:
+    if job.status == "running":
+        return job.started_at is None or job.started_at >= _stale_before()
+    return job.status == "queued"
+
+def _resume_fix_jobs():
+    requeued = FixJob.query.filter(FixJob.status == "running", FixJob.started_at < _stale_before()).update(
+        {"status": "queued", "started_at": None}, synchronize_session=False
+    )
+    db.session.commit()
+    if requeued:
+        logger.info("Requeued %s fix jobs abandoned mid-run", requeued)
+    queued = db.session.query(FixJob.id, Item.user_id).join(Item, FixJob.item_id == Item.id).filter(FixJob.status == "queued")
+    for job_id, user_id in queued.all():
+        fix_jobs.submit(job_id, owner=user_id)
+
+fix_jobs.init_app(app, _run_fix_job)
+
+# ── MAIL OUTBOX ──────────────────────────────────────────────
+MAIL_SEND_LATENCY = metrics.histogram("mail_send_duration_seconds", "SMTP time per message, connection setup included.", ("outcome",))
+MAIL_RESULTS = metrics.counter("mail_results_total", "Outbox delivery attempts by result.", ("result",))
+MAIL_LEASE = timedelta(minutes=5)
+
+def _smtp_sender() -> SMTPSender:
+    return SMTPSender(
+        app.config["MAIL_SERVER"], app.config["MAIL_PORT"],
+        use_tls=app.config["MAIL_USE_TLS"], use_ssl=app.config["MAIL_USE_SSL"],
+        username=app.config["MAIL_USERNAME"], password=app.config["MAIL_PASSWORD"],
+        timeout=app.config["MAIL_TIMEOUT_SECONDS"],
+    )
+
+def _claim_mail(limit: int) -> list:
+    # Claimed rows get a lease instead of a lock: a sender that dies mid-batch leaves them due again in 5 minutes.
+    now = datetime.utcnow()
+    due = [mail_id for (mail_id,) in db.session.query(OutboxMail.id)
+           .filter(OutboxMail.status.in_(["queued", "sending"]), OutboxMail.next_attempt_at <= now)
+           .order_by(OutboxMail.next_attempt_at).limit(limit)]
+    if not due:
+        db.session.rollback()
+        return []
+    token = secrets.token_hex(8)
+    OutboxMail.query.filter(OutboxMail.id.in_(due), OutboxMail.status.in_(["queued", "sending"]), OutboxMail.next_attempt_at <= now).update(
+        {"status": "sending", "claim_token": token, "next_attempt_at": now + MAIL_LEASE}, synchronize_session=False
+    )
+    db.session.commit()
+    rows = (db.session.query(OutboxMail.id, OutboxMail.to_email, OutboxMail.subject, OutboxMail.body)
+            .filter(OutboxMail.id.in_(due), OutboxMail.claim_token == token).all())
+    db.session.rollback()
+    return [tuple(row) for row in rows]
+
+def _complete_mail(results: list):
+    errors = dict(results)
+    now = datetime.utcnow()
+    for row in OutboxMail.query.filter(OutboxMail.id.in_(list(errors))).all():
+        error = errors[row.id]
+        row.attempts += 1
+        row.claim_token = None
+        if error is None:
+            row.status, row.sent_at, row.last_error = "sent", now, None
+            MAIL_RESULTS.inc("sent")
+        elif row.attempts >= app.config["MAIL_MAX_ATTEMPTS"]:
+            row.status, row.last_error = "failed", str(error)[:300]
+            MAIL_RESULTS.inc("failed")
+            logger.error("Mail %s to %s gave up after %s attempts: %s", row.id, row.to_email, row.attempts, error)
+        else:
+            row.status, row.last_error = "queued", str(error)[:300]
+            row.next_attempt_at = now + timedelta(seconds=retry_delay(row.attempts, app.config["MAIL_RETRY_BACKOFF_SECONDS"]))
+            MAIL_RESULTS.inc("retry")
+    db.session.commit()
+
+mail_outbox = MailOutbox(
+    sender_factory=_smtp_sender,
+    sender=app.config["MAIL_DEFAULT_SENDER"],
+    batch_size=app.config["MAIL_OUTBOX_BATCH_SIZE"],
+    poll_interval=app.config["MAIL_OUTBOX_POLL_SECONDS"],
+    observe=lambda seconds, outcome: MAIL_SEND_LATENCY.observe(seconds, outcome),
+)
+mail_outbox.init_app(app, _claim_mail, _complete_mail)
+
+@app.before_request
+def _start_mail_outbox():
+    # A no-op once this worker's sender thread runs; also picks up mail left queued by a restart.
+    if _mail_configured():
+        mail_outbox.start()
+
+# ── STARTUP ──────────────────────────────────────────────────
+_worker_pid = None
+_worker_lock = threading.Lock()
+
+def init_schema(batch_size: int = 1000, progress=None):
+    """Create missing tables and item columns, then convert legacy item rows.
+
+    Safe to run from several processes at once. Legacy rows are converted
+    before anything is served: the edit form of an unconverted row would show
+    empty content, and saving it would overwrite the old data for good.
+    """
+    # A lost race means another process created that table (or item column) after our
+    # existence check, so each retry gets past at least one more.
+    attempts = len(db.metadata.sorted_tables) + len(ITEM_COLUMNS) + 1
+    for attempt in range(attempts):
+        try:
+            db.create_all()
+            added = _add_item_columns()
+            break
+        except OperationalError as e:
+            db.session.rollback()
+            if attempt == attempts - 1:
+                raise
+            logger.info("Schema creation raced another process (%s); retrying", e.orig)
+    if added:
+        logger.info("Added item columns: %s", ", ".join(added))
+    converted = _convert_legacy_items(batch_size, progress)
+    if converted:
+        logger.info("Converted %s items saved by an older version", converted)
+    return converted
+
+def boot():
+    """One-time setup for every entry point, before the first request is served."""
+    with app.app_context():
+        init_schema()
+
+def prefork():
+    """Warm shared state in the gunicorn master so preloaded workers inherit it copy-on-write."""
+    _ai_client()
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    # Connections opened at boot must not be shared by the forked workers.
+    with app.app_context():
+        db.engine.dispose()
+    # Keep the collector from touching (and so copying) every page the workers inherit.
+    gc.freeze()
+
+@app.before_request
+def _start_worker():
+    # Per process rather than at import, so a preloading master never runs jobs its workers will also run.
+    global _worker_pid
+    if _worker_pid == os.getpid():
+        return
+    with _worker_lock:
+        if _worker_pid == os.getpid():
+            return
+        try:
+            _resume_fix_jobs()
+        except Exception:
+            db.session.rollback()
+            logger.exception("Could not resume queued fix jobs")
+        _worker_pid = os.getpid()
+
+# ── DASHBOARD PAGINATION ─────────────────────────────────────
+def _encode_cursor(updated_at: datetime, item_id: int) -> str:
+    return f"{updated_at.isoformat()}_{item_id}"
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    stamp, _, item_id = cursor.rpartition("_")
+    return datetime.fromisoformat(stamp), int(item_id)
+
+def _dashboard_page(user_id: int, cursor: str = None, limit: int = None):
+    """One page of dashboard cards, newest first, plus the cursor for the next page.
+
+    Only the columns a card renders are selected; the (updated_at, id) keyset keeps
+    deep pages as cheap as the first one.
+    """
+    limit = max(1, min(limit or app.config["DASHBOARD_PAGE_SIZE"], 100))
+    query = (db.session.query(Item.id, Item.title, Item.updated_at)
+             .filter(Item.user_id == user_id)
+             .order_by(Item.updated_at.desc(), Item.id.desc()))
+    if cursor:
+        stamp, last_id = _decode_cursor(cursor)
+        query = query.filter(db.or_(Item.updated_at < stamp, db.and_(Item.updated_at == stamp, Item.id < last_id)))
+    rows = query.limit(limit + 1).all()
+    next_cursor = _encode_cursor(rows[limit - 1].updated_at, rows[limit - 1].id) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+# ── RENDER CACHE ─────────────────────────────────────────────
+card_fragments = FragmentCache(app.config["FRAGMENT_CACHE_MAX_ENTRIES"])
+_fallback_notice = {"mtime": None, "message": None}
+
+def _fallback_message():
+    # Re-read only when the file changes; a stat is far cheaper than open+read on every dashboard hit.
+    try:
+        mtime = os.stat(FALLBACK_REASON_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if _fallback_notice["mtime"] != mtime:
+        try:
+            with open(FALLBACK_REASON_FILE, "r", encoding="utf-8") as f:
+                message = f.read().strip()
+        except FileNotFoundError:
+            return None
+        lowered = message.lower()
+        if "openai client unavailable" in lowered or "openai_api_key missing" in lowered:
+            message = None
+        _fallback_notice.update(mtime=mtime, message=message)
+    return _fallback_notice["message"]
+
+def _render_cards(rows) -> list:
+    token = generate_csrf()
+    cards = []
+    for index, row in enumerate(rows):
+        html = card_fragments.get_or_render(row.id, row.updated_at, lambda: render_template(
+            "_dashboard_card.html", item=row, card_index=INDEX_PLACEHOLDER, csrf_value=CSRF_PLACEHOLDER
+        ))
+        cards.append(Markup(html.replace(CSRF_PLACEHOLDER, token).replace(INDEX_PLACEHOLDER, str(index))))
+    return cards
+
+def _page_etag(*parts):
+    """ETag for a per-user page, or None when the page must not be revalidated.
+
+    Pages carry a CSRF token, so the tag also covers the session's token and a
+    time bucket shorter than the token lifetime. Pending flash messages are
+    one-shot and always force a fresh render.
+    """
+    if session.get("_flashes"):
+        return None
+    bucket = int(time.time() // max(60, (app.config.get("WTF_CSRF_TIME_LIMIT") or 3600) // 2))
+    return make_etag(current_user.id, session.get("csrf_token"), bucket, *parts)
+
+def _not_modified(etag, last_modified: datetime = None) -> bool:
+    if etag is None:
+        return False
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    since = request.if_modified_since
+    return bool(since and last_modified and last_modified.replace(microsecond=0, tzinfo=since.tzinfo) <= since)
+
+def _conditional(etag, last_modified: datetime, render):
+    """Answer 304 when the client's copy is current, else render and tag the response."""
+    response = Response(status=304) if _not_modified(etag, last_modified) else make_response(render())
+    if etag is not None:
+        response.set_etag(etag)
+        if last_modified:
+            response.last_modified = last_modified
+        response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
 # ── ROUTES ───────────────────────────────────────────────────
 @app.route("/")
 def home():
     return render_template("home.html")
 
 @app.route("/signup", methods=["GET", "POST"])
+@rate_limited("auth", per="ip", methods={"POST"})
 def signup():
     if current_user.is_authenticated:
         return redirect(url_for("dashboard"))
@@ -171,13 +1069,13 @@ def signup():
             user = User(
                 username=username,
                 email=email,
-                password=generate_password_hash(password, method="pbkdf2:sha256")
+                password=passwords.hash(password)
             )
+            if not EMAIL_VERIFICATION_REQUIRED:
+                user.is_verified = True
             db.session.add(user)
             db.session.commit()
             if not EMAIL_VERIFICATION_REQUIRED:
-                user.is_verified = True
-                db.session.commit()
                 login_user(user, remember=True)
                 flash(f"Welcome, {user.username}! Account created.", "success")
                 return redirect(url_for("dashboard"))
@@ -196,6 +1094,7 @@ def signup():
     return render_template("signup.html")
 
 @app.route("/login", methods=["GET", "POST"])
+@rate_limited("auth", per="ip", methods={"POST"})
 def login():
     if current_user.is_authenticated:
         return redirect(url_for("dashboard"))
@@ -203,13 +1102,16 @@ def login():
         username = request.form.get("username", "").strip()
         password = request.form.get("password", "")
         user = User.query.filter((User.username == username) | (User.email == username.lower())).first()
-        if user and check_password_hash(user.password, password):
+        if user and passwords.verify(user.password, password):
             if not user.is_verified:
                 if EMAIL_VERIFICATION_REQUIRED:
                     flash("Please verify your email before login.", "error")
                     return redirect(url_for("login"))
                 user.is_verified = True
-                db.session.commit()
+            if passwords.needs_rehash(user.password):
+                # Only login sees the plaintext, so hashes are upgraded to the configured cost here.
+                user.password = passwords.hash(password)
+            db.session.commit()
             login_user(user, remember=True)
             flash(f"Welcome back, {user.username}!", "success")
             return redirect(url_for("dashboard"))
@@ -235,10 +1137,12 @@ def verify_email(token):
 
 @app.route("/resend-verification", methods=["POST"])
 @csrf.exempt
+@rate_limited("mail", per="ip", fallback="login")
 def resend_verification():
     email = request.form.get("email", "").strip().lower()
     user = User.query.filter_by(email=email).first()
-    if user and not user.is_verified:
+    # The per-address bucket is silent so the response never reveals whether an account exists.
+    if user and not user.is_verified and not limiter.hit("mail", f"to:{email}"):
         token = _token("verify", user.id)
         verify_link = url_for("verify_email", token=token, _external=True)
         _send_mail(user.email, "Verify your account", f"Verify: {verify_link}")
@@ -246,11 +1150,12 @@ def resend_verification():
     return redirect(url_for("login"))
 
 @app.route("/forgot-password", methods=["GET", "POST"])
+@rate_limited("mail", per="ip", methods={"POST"})
 def forgot_password():
     if request.method == "POST":
         email = request.form.get("email", "").strip().lower()
         user = User.query.filter_by(email=email).first()
-        if user:
+        if user and not limiter.hit("mail", f"to:{email}"):
             token = _token("reset", user.id)
             reset_link = url_for("reset_password", token=token, _external=True)
             _send_mail(user.email, "Reset your password", f"Reset password: {reset_link}")
@@ -259,6 +1164,7 @@ def forgot_password():
     return render_template("forgot_password.html")
 
 @app.route("/reset-password/<token>", methods=["GET", "POST"])
+@rate_limited("auth", per="ip", methods={"POST"})
 def reset_password(token):
     user = _verify_token(token, "reset", max_age=60 * 60)
     if not user:
@@ -272,7 +1178,7 @@ def reset_password(token):
         elif password != confirm:
             flash("Passwords do not match.", "error")
         else:
-            user.password = generate_password_hash(password, method="pbkdf2:sha256")
+            user.password = passwords.hash(password)
             db.session.commit()
             flash("Password reset successful. Please login.", "success")
             return redirect(url_for("login"))
@@ -281,24 +1187,50 @@ def reset_password(token):
 @app.route("/dashboard")
 @login_required
 def dashboard():
-    items = Item.query.filter_by(user_id=current_user.id).order_by(Item.updated_at.desc()).all()
-    fallback_msg = None
+    # The page query is the only query: the ETag covers exactly the cards shown plus the cursor.
+    items, next_cursor = _dashboard_page(current_user.id)
+    fallback_msg = _fallback_message()
+    latest = max((row.updated_at for row in items), default=None)
+    etag = _page_etag("dashboard", [(row.id, row.updated_at) for row in items], next_cursor, current_user.is_verified, fallback_msg)
+    return _conditional(etag, latest, lambda: render_template(
+        "dashboard.html", cards=_render_cards(items), next_cursor=next_cursor, fallback_msg=fallback_msg,
+        project_name="create-a-production-ready-flask-web-app-called-60secai-ai-fix-my",
+    ))
+
+@app.route("/dashboard/items")
+@login_required
+def dashboard_items():
     try:
-        with open("ai-fallback-reason.txt", "r", encoding="utf-8") as f:
-            fallback_msg = f.read().strip()
-    except FileNotFoundError:
-        pass
-    if fallback_msg:
-        lowered = fallback_msg.lower()
-        if "openai client unavailable" in lowered or "openai_api_key missing" in lowered:
-            fallback_msg = None
-    return render_template("dashboard.html", items=items, fallback_msg=fallback_msg, project_name="create-a-production-ready-flask-web-app-called-60secai-ai-fix-my")
+        items, next_cursor = _dashboard_page(current_user.id, request.args.get("cursor"), request.args.get("limit", type=int))
+    except ValueError:
+        return jsonify({"error": "invalid cursor"}), 400
+    return jsonify({
+        "items": [
+            {"id": row.id, "title": row.title, "updated_at": row.updated_at.isoformat(), "updated_label": row.updated_at.strftime("%b %d, %Y")}
+            for row in items
+        ],
+        "next_cursor": next_cursor,
+    })
+
+@app.route("/search")
+@login_required
+def search():
+    query = request.args.get("q", "").strip()
+    page = max(1, request.args.get("page", 1, type=int))
+    per_page = max(1, min(request.args.get("per_page", app.config["SEARCH_PAGE_SIZE"], type=int), 50))
+    results = search_index.search(db.session.connection(), current_user.id, query, limit=per_page + 1, offset=(page - 1) * per_page)
+    return jsonify({
+        "query": query,
+        "page": page,
+        "results": results[:per_page],
+        "next_page": page + 1 if len(results) > per_page else None,
+    })
 
 @app.route("/fallback/clear", methods=["POST"])
 @login_required
 def clear_fallback_reason():
     try:
-        os.remove("ai-fallback-reason.txt")
+        os.remove(FALLBACK_REASON_FILE)
         flash("Fallback notice cleared.", "success")
     except FileNotFoundError:
         pass
@@ -313,6 +1245,7 @@ def new_item():
 
 @app.route("/item/save", methods=["POST"])
 @login_required
+@rate_limited("save")
 def save_item():
     try:
         data = request.get_json()
@@ -321,53 +1254,45 @@ def save_item():
         generate_fix = bool(data.pop("generate_fix", False))
         problem_text = str(data.get("content", "")).strip()
         generate_fix = generate_fix or bool(problem_text)
-        item_id = data.get("id")
+        stream_fix = bool(data.pop("stream_fix", False))
+        item_id = data.pop("id", None)
+        title = str(data.pop("title", "") or "")[:100]
+        data.pop("content", None)
+        data.pop("ai_fix", None)
+        content_hash = _content_hash(problem_text)
         if item_id:
             item = Item.query.filter_by(id=item_id, user_id=current_user.id).first_or_404()
-            item.title      = str(data.get("title", item.title))[:100]
-            item.data       = json.dumps(data)
+            item.title = title or item.title
             item.updated_at = datetime.utcnow()
+            # Unchanged problem text keeps its existing fix instead of paying for a new one.
+            if content_hash == item.content_hash and item.ai_fix:
+                generate_fix = False
+            else:
+                item.ai_fix, item.fix_status, item.fix_source = None, "none", None
         else:
-            item = Item(
-                title   = str(data.get("title", "Untitled"))[:100],
-                data    = json.dumps(data),
-                user_id = current_user.id
-            )
+            item = Item(title=title or "Untitled", user_id=current_user.id)
             db.session.add(item)
-        db.session.commit()
+        item.content = problem_text
+        item.content_hash = content_hash
+        item.data = json.dumps(data)
 
-        if generate_fix:
-            ai_fix = ""
-            if AI_ENABLED and AI_CLIENT and problem_text:
-                ai_prompt = (
-                    "User problem:\n"
-                    f"{problem_text}\n\n"
-                    "You are a 60-second life coach. Return:\n"
-                    "1) Quick situation analysis\n"
-                    "2) 3-5 immediate actions\n"
-                    "3) Short motivation line\n"
-                    "4) Next 2-3 hour micro-plan\n"
-                    "Tone: empathetic, clear, practical.\n"
-                )
-                try:
-                    response = AI_CLIENT.chat.completions.create(
-                        model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-                        messages=[{"role": "user", "content": ai_prompt}],
-                        max_tokens=450,
-                        temperature=0.7,
-                    )
-                    ai_fix = (response.choices[0].message.content or "").strip()
-                except Exception as e:
-                    logger.warning("AI fix generation failed: %s", e)
-            if not ai_fix and problem_text:
-                ai_fix = _local_60sec_fix(problem_text)
-            if ai_fix:
-                current_data = json.loads(item.data)
-                current_data["ai_fix"] = ai_fix
-                item.data = json.dumps(current_data)
-                db.session.commit()
+        job = None
+        if generate_fix and problem_text and not stream_fix:
+            if limiter.hit("ai", _limit_key("user")):
+                # Over the AI rate: keep the save and give the instant local plan instead of a 429.
+                item.ai_fix, item.fix_status, item.fix_source = _local_60sec_fix(problem_text), "ready", "local"
+                AI_RESULTS.inc("fix", "local")
+            else:
+                job = _add_fix_job(item)
+        db.session.commit()
+        card_fragments.invalidate(item.id)
+        if job is not None:
+            fix_jobs.submit(job.id, owner=current_user.id)
 
-        return jsonify({"success": True, "id": item.id})
+        payload = {"success": True, "id": item.id, "job": job.to_dict() if job else None}
+        if stream_fix:
+            payload["stream_url"] = url_for("stream_fix", item_id=item.id)
+        return jsonify(payload), (202 if job else 200)
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
@@ -376,41 +1301,86 @@ def save_item():
 @login_required
 def view_item(item_id):
     item = Item.query.filter_by(id=item_id, user_id=current_user.id).first_or_404()
-    data = json.loads(item.data)
+    pending_job = None
+    # Older items without a fix are filled by `flask backfill-fixes`; the read path never calls the model.
+    if item.fix_status == "pending":
+        job = FixJob.query.filter_by(item_id=item.id).order_by(FixJob.id.desc()).first()
+        pending_job = job if job and _job_in_flight(job) else None
+    etag = _page_etag("item", item.id, item.updated_at, item.fix_status, pending_job.id if pending_job else None)
+    return _conditional(etag, item.updated_at, lambda: render_template("item_view.html", item=item, pending_job=pending_job))
 
-    # Backfill AI fix for older items that were saved before auto-fix logic.
-    if "ai_fix" not in data:
-        problem_text = str(data.get("content", "")).strip()
-        if problem_text:
-            ai_fix = ""
-            if AI_ENABLED and AI_CLIENT:
-                ai_prompt = (
-                    "User problem:\n"
-                    f"{problem_text}\n\n"
-                    "You are a 60-second life coach. Return:\n"
-                    "1) Quick situation analysis\n"
-                    "2) 3-5 immediate actions\n"
-                    "3) Short motivation line\n"
-                    "4) Next 2-3 hour micro-plan\n"
-                    "Tone: empathetic, clear, practical.\n"
-                )
-                try:
-                    response = AI_CLIENT.chat.completions.create(
-                        model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-                        messages=[{"role": "user", "content": ai_prompt}],
-                        max_tokens=450,
-                        temperature=0.7,
-                    )
-                    ai_fix = (response.choices[0].message.content or "").strip()
-                except Exception as e:
-                    logger.warning("AI backfill failed: %s", e)
-            if not ai_fix:
-                ai_fix = _local_60sec_fix(problem_text)
-            data["ai_fix"] = ai_fix
-            item.data = json.dumps(data)
+@app.route("/item/<int:item_id>/fix", methods=["POST"])
+@login_required
+@rate_limited("ai", fallback="view_item")
+def request_fix(item_id):
+    item = Item.query.filter_by(id=item_id, user_id=current_user.id).first_or_404()
+    if item.ai_fix or not item.content.strip():
+        return redirect(url_for("view_item", item_id=item.id))
+    abandoned = FixJob.query.filter(FixJob.item_id == item.id, FixJob.status == "running", FixJob.started_at < _stale_before()).update(
+        {"status": "failed", "error": "worker stopped mid-run"}, synchronize_session=False
+    )
+    if abandoned:
+        db.session.commit()
+    pending = FixJob.query.filter(FixJob.item_id == item.id, FixJob.status.in_(["queued", "running"])).first()
+    if pending is None:
+        job = _add_fix_job(item)
+        db.session.commit()
+        fix_jobs.submit(job.id, owner=current_user.id)
+    return redirect(url_for("view_item", item_id=item.id))
+
+@app.route("/item/<int:item_id>/fix/stream")
+@login_required
+@rate_limited("ai")
+def stream_fix(item_id):
+    item = Item.query.filter_by(id=item_id, user_id=current_user.id).first_or_404()
+    problem_text, stored_fix, content_hash, user_id = item.content.strip(), item.ai_fix, item.content_hash, item.user_id
+    # Hand the pooled connection back for the length of the stream; _store_fix checks one out again at the end.
+    db.session.close()
+
+    def events():
+        if stored_fix:
+            yield _sse({"delta": stored_fix})
+            yield _sse({"id": item_id, "source": "stored"}, event="done")
+            return
+        if not problem_text:
+            yield _sse({"id": item_id, "source": None}, event="done")
+            return
+        parts, source = [], "local"
+        try:
+            for delta, source in _stream_fix_chunks(problem_text, user_id):
+                parts.append(delta)
+                yield _sse({"delta": delta})
+        except Exception:
+            # Nothing was stored, so the item page offers to generate the fix again.
+            yield _sse({"error": "The AI fix was interrupted, please try again"}, event="error")
+            return
+        try:
+            if not _store_fix(item_id, content_hash, "".join(parts).strip(), source):
+                raise LookupError("item changed or deleted while streaming")
             db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.warning("Could not persist streamed fix for item %s: %s", item_id, e)
+            yield _sse({"error": "Fix could not be saved"}, event="error")
+            return
+        yield _sse({"id": item_id, "source": source}, event="done")
 
-    return render_template("item_view.html", item=item, data=data)
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(stream_with_context(events()), mimetype="text/event-stream", headers=headers)
+
+@app.route("/ai/jobs/<int:job_id>")
+@login_required
+def fix_job_status(job_id):
+    row = (db.session.query(FixJob, Item)
+           .join(Item, FixJob.item_id == Item.id)
+           .filter(FixJob.id == job_id, Item.user_id == current_user.id).first_or_404())
+    job, item = row
+    payload = job.to_dict()
+    if job.status == "running" and not _job_in_flight(job):
+        payload["status"] = "failed"
+    if job.status == "done":
+        payload["ai_fix"] = item.ai_fix or ""
+    return jsonify(payload)
 
 @app.route("/item/<int:item_id>/edit")
 @login_required
@@ -424,31 +1394,52 @@ def delete_item(item_id):
     item = Item.query.filter_by(id=item_id, user_id=current_user.id).first_or_404()
     db.session.delete(item)
     db.session.commit()
+    card_fragments.invalidate(item_id)
     flash("Deleted successfully!", "success")
     return redirect(url_for("dashboard"))
 
 @app.route("/project/export.zip")
 @login_required
 def export_project_zip():
-    root = Path.cwd()
+    root = app.config["EXPORT_ROOT"] or os.getcwd()
     excluded = {".git", "__pycache__", ".venv", "venv", ".pytest_cache"}
-    mem = io.BytesIO()
-    with zipfile.ZipFile(mem, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-        for path in root.rglob("*"):
-            if not path.is_file():
-                continue
-            if any(part in excluded for part in path.parts):
-                continue
-            rel = path.relative_to(root)
-            zf.write(path, arcname=str(rel))
-    mem.seek(0)
-    return send_file(
-        mem,
+    cache_dir = app.config["EXPORT_CACHE_DIR"]
+    db_path = db.engine.url.database if db.engine.url.get_backend_name() == "sqlite" else None
+    # The instance folder and the live DB (with its journal files) are never read directly:
+    # the DB is either left out or added as a consistent snapshot taken with the SQLite backup API.
+    skip = [app.instance_path, cache_dir] + ([db_path + suffix for suffix in ("",) + SQLITE_SIDE_FILES] if db_path else [])
+    snapshot = db_path if app.config["EXPORT_DATABASE"] == "snapshot" else None
+    arcname = f"instance/{os.path.basename(db_path)}" if snapshot else None
+    cache = _export_cache() if cache_dir else None
+    chunks = iter_project_zip(root, excluded, skip, cache=cache, db_path=snapshot, db_arcname=arcname)
+    return Response(
+        _timed_export(chunks),
         mimetype="application/zip",
-        as_attachment=True,
-        download_name=f"create-a-production-ready-flask-web-app-called-60secai-ai-fix-my.zip"
+        headers={
+            "Content-Disposition": 'attachment; filename="create-a-production-ready-flask-web-app-called-60secai-ai-fix-my.zip"',
+            "X-Accel-Buffering": "no",
+        },
     )
 
+_EXPORT_CACHES = {}
+
+def _timed_export(chunks):
+    started, sent = time.perf_counter(), 0
+    try:
+        for chunk in chunks:
+            sent += len(chunk)
+            yield chunk
+    finally:
+        EXPORT_LATENCY.observe(time.perf_counter() - started)
+        EXPORT_BYTES.inc(amount=sent)
+
+def _export_cache():
+    # One manifest per process and directory, so concurrent exports share what is already compressed.
+    cache_dir = app.config["EXPORT_CACHE_DIR"]
+    if cache_dir not in _EXPORT_CACHES:
+        _EXPORT_CACHES[cache_dir] = CompressedEntryCache(cache_dir)
+    return _EXPORT_CACHES[cache_dir]
+
 @app.route("/item/<int:item_id>/pdf")
 @login_required
 def download_pdf(item_id):
@@ -457,36 +1448,213 @@ def download_pdf(item_id):
 
 @app.route("/ai/bullets", methods=["POST"])
 @login_required
+@rate_limited("ai")
 def ai_bullets():
-    if not AI_ENABLED or AI_CLIENT is None:
+    if not _ai_ready():
         return jsonify({"error": "AI unavailable. Set OPENAI_API_KEY and install openai."}), 503
     data = request.get_json() or {}
     section = str(data.get("section", "")).strip()
     context = str(data.get("context", "")).strip()
     if not section or not context:
         return jsonify({"error": "section and context are required"}), 400
-    prompt = (
-        "You are a professional resume writer.\n"
-        "Generate 3-4 strong, ATS-optimized bullet points.\n"
-        f"Section: {section}\n"
-        f"Context: {context}\n"
-        "Rules:\n"
-        "- Start each bullet with a strong action verb\n"
-        "- Include metrics where possible\n"
-        "- Keep each bullet under 120 characters\n"
-        "Return ONLY bullets, one per line, starting with •"
-    )
-    response = AI_CLIENT.chat.completions.create(
-        model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-        messages=[{"role": "user", "content": prompt}],
-        max_tokens=300,
-        temperature=0.7,
-    )
-    text = response.choices[0].message.content or ""
-    bullets = [line.strip() for line in text.split("\n") if line.strip().startswith("•")]
-    if not bullets:
-        bullets = [line.strip() for line in text.split("\n") if line.strip()]
-    return jsonify({"bullets": bullets})
+    try:
+        text = _chat_completion(_bullets_prompt(section, context), max_tokens=300, user_id=current_user.id)
+    except QuotaExceeded:
+        AI_RESULTS.inc("bullets", "local")
+        return jsonify({"bullets": _local_bullets(section, context), "source": "local",
+                        "notice": "Daily AI quota reached; showing a template."})
+    except Exception as e:
+        logger.warning("AI bullets failed: %s", e)
+        AI_RESULTS.inc("bullets", "error")
+        return jsonify({"error": "AI temporarily unavailable. Please retry shortly."}), 503
+    AI_RESULTS.inc("bullets", "ai")
+    return jsonify({"bullets": _parse_bullets(text)})
+
+@app.route("/ai/bullets/batch", methods=["POST"])
+@login_required
+def ai_bullets_batch():
+    data = request.get_json() or {}
+    sections = data.get("sections")
+    if not isinstance(sections, list) or not sections:
+        return jsonify({"error": "sections must be a non-empty list"}), 400
+    if len(sections) > app.config["BULLETS_BATCH_MAX"]:
+        return jsonify({"error": f"at most {app.config['BULLETS_BATCH_MAX']} sections per batch"}), 400
+
+    results = [None] * len(sections)
+    unique = {}
+    for index, entry in enumerate(sections):
+        entry = entry if isinstance(entry, dict) else {}
+        section = str(entry.get("section", "")).strip()
+        context = str(entry.get("context", "")).strip()
+        if not section or not context:
+            results[index] = {"section": section, "bullets": [], "source": None, "error": "section and context are required"}
+            continue
+        # Identical requests in one batch are generated once and shared.
+        unique.setdefault((section.lower(), " ".join(context.split()).lower()), []).append((index, section, context))
+
+    if unique:
+        # One AI token per distinct section, so a batch cannot sidestep the per-user rate.
+        retry_after = limiter.hit("ai", _limit_key("user"), cost=len(unique))
+        if retry_after:
+            return _too_many_requests(retry_after)
+        workers = min(app.config["BULLETS_BATCH_WORKERS"], len(unique))
+        user_id = current_user.id
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bullets") as pool:
+            futures = {key: pool.submit(_bullets_one, targets[0][1], targets[0][2], user_id) for key, targets in unique.items()}
+            for key, targets in unique.items():
+                bullets, source, error = futures[key].result()
+                for index, section, _ in targets:
+                    results[index] = {"section": section, "bullets": bullets, "source": source, "error": error}
+    return jsonify({"results": results, "ai_enabled": _ai_ready()})
+
+# ── CLI ──────────────────────────────────────────────────────
+BACKFILL_CHECKPOINT = os.path.join(app.instance_path, "backfill-fixes.json")
+
+def _read_checkpoint(path: str) -> int:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return int(json.load(f).get("last_id", 0))
+    except (FileNotFoundError, ValueError):
+        return 0
+
+def _write_checkpoint(path: str, last_id: int, done: int):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"last_id": last_id, "processed": done, "updated_at": datetime.utcnow().isoformat()}, f)
+    os.replace(tmp, path)
+
+def _backfill_one(problem_text: str) -> tuple[str, str]:
+    # Pool threads need their own app context for the completion cache's DB tier.
+    with app.app_context():
+        return _generate_fix(problem_text)
+
+@app.cli.command("backfill-fixes")
+@click.option("--batch-size", default=200, show_default=True, help="Items loaded and committed per batch.")
+@click.option("--workers", default=4, show_default=True, help="Concurrent fix generations.")
+@click.option("--limit", default=0, help="Stop after this many items (0 = no limit).")
+@click.option("--checkpoint", default=BACKFILL_CHECKPOINT, show_default=True, help="Progress file for resuming.")
+@click.option("--restart", is_flag=True, help="Ignore the checkpoint and start from the first item.")
+def backfill_fixes(batch_size, workers, limit, checkpoint, restart):
+    """Generate ai_fix for items saved before fixes were automatic."""
+    last_id = 0 if restart else _read_checkpoint(checkpoint)
+    done = 0
+    started = datetime.utcnow()
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="backfill") as pool:
+        while not limit or done < limit:
+            size = min(batch_size, limit - done) if limit else batch_size
+            rows = (db.session.query(Item.id, Item.content, Item.content_hash)
+                    .filter(Item.id > last_id, Item.ai_fix.is_(None), Item.content != "")
+                    .order_by(Item.id.asc())
+                    .limit(size).all())
+            if not rows:
+                break
+            fixes = pool.map(_backfill_one, [content.strip() for _, content, _ in rows])
+            for (item_id, _, content_hash), (ai_fix, source) in zip(rows, fixes):
+                _store_fix(item_id, content_hash, ai_fix, source, touch=False)
+            db.session.commit()
+            last_id = rows[-1][0]
+            done += len(rows)
+            _write_checkpoint(checkpoint, last_id, done)
+            click.echo(f"backfilled {done} items (last id {last_id})")
+    click.echo(f"done: {done} items in {(datetime.utcnow() - started).total_seconds():.1f}s")
+
+@app.cli.command("reindex-search")
+@click.option("--batch-size", default=5000, show_default=True, help="Item ids indexed per transaction.")
+def reindex_search(batch_size):
+    """Rebuild the full-text search index from the item table."""
+    max_id = db.session.query(db.func.max(Item.id)).scalar() or 0
+    db.session.remove()
+    started = datetime.utcnow()
+    search_index.reindex(db.engine.connect, max_id, batch_size, progress=lambda n: click.echo(f"indexed up to id {n}"))
+    click.echo(f"done: reindexed ids 1..{max_id} in {(datetime.utcnow() - started).total_seconds():.1f}s")
+
+@app.cli.command("prune-outbox")
+@click.option("--days", default=7, show_default=True, help="Delete sent mails older than this.")
+def prune_outbox(days):
+    """Delete delivered outbox mails; failed ones are kept for inspection."""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    deleted = OutboxMail.query.filter(OutboxMail.status == "sent", OutboxMail.sent_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    click.echo(f"deleted {deleted} sent mails older than {days} days")
+
+ITEM_COLUMNS = {
+    "content": "TEXT NOT NULL DEFAULT ''",
+    "ai_fix": "TEXT",
+    "fix_status": "VARCHAR(20) NOT NULL DEFAULT 'none'",
+    "fix_source": "VARCHAR(20)",
+    "content_hash": "VARCHAR(64)",
+}
+
+def _add_item_columns() -> list:
+    """Add the columns newer code expects to an ``item`` table created by an older version."""
+    existing = {col["name"] for col in db.inspect(db.engine).get_columns("item")}
+    added = [name for name in ITEM_COLUMNS if name not in existing]
+    for name in added:
+        db.session.execute(db.text(f"ALTER TABLE item ADD COLUMN {name} {ITEM_COLUMNS[name]}"))
+    db.session.execute(db.text("CREATE INDEX IF NOT EXISTS ix_item_content_hash ON item (content_hash)"))
+    db.session.execute(db.text("CREATE INDEX IF NOT EXISTS ix_item_user_updated ON item (user_id, updated_at, id)"))
+    db.session.commit()
+    return added
+
+def _convert_legacy_items(batch_size: int = 1000, progress=None) -> int:
+    """Move content/ai_fix out of the Item.data JSON blob into real columns; returns the rows converted."""
+    table = Item.__table__
+    last_id, converted = 0, 0
+    while True:
+        # Rows written by the current code always carry a hash, so NULL marks a legacy blob.
+        rows = db.session.execute(
+            db.select(table.c.id, table.c.data)
+            .where(table.c.id > last_id, table.c.content_hash.is_(None))
+            .order_by(table.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        updates = []
+        for item_id, raw in rows:
+            try:
+                data = json.loads(raw or "{}")
+            except ValueError:
+                data = {"content": raw}
+            if not isinstance(data, dict):
+                data = {"content": str(data)}
+            content = str(data.pop("content", "") or "").strip()
+            ai_fix = data.pop("ai_fix", None) or None
+            data.pop("id", None)
+            data.pop("title", None)
+            updates.append({
+                "b_id": item_id,
+                "content": content,
+                "ai_fix": ai_fix,
+                "fix_status": "ready" if ai_fix else "none",
+                "fix_source": "legacy" if ai_fix else None,
+                "content_hash": _content_hash(content),
+                "data": json.dumps(data),
+            })
+        db.session.execute(
+            # Still NULL: another booting process may have converted the row meanwhile.
+            table.update().where(table.c.id == db.bindparam("b_id"), table.c.content_hash.is_(None)).values(
+                content=db.bindparam("content"), ai_fix=db.bindparam("ai_fix"),
+                fix_status=db.bindparam("fix_status"), fix_source=db.bindparam("fix_source"),
+                content_hash=db.bindparam("content_hash"), data=db.bindparam("data"),
+                # A format conversion, not an edit: keep the onupdate stamp from re-dating every item.
+                updated_at=table.c.updated_at,
+            ),
+            updates,
+        )
+        db.session.commit()
+        last_id = rows[-1][0]
+        converted += len(rows)
+        if progress:
+            progress(f"converted {converted} items (last id {last_id})")
+    return converted
+
+@app.cli.command("migrate-items")
+@click.option("--batch-size", default=1000, show_default=True, help="Rows converted per commit.")
+def migrate_items(batch_size):
+    """Move content/ai_fix out of the Item.data JSON blob into real columns (also done at startup)."""
+    converted = init_schema(batch_size, progress=click.echo)
+    click.echo(f"done: {converted} items converted")
 
 # ── ERROR HANDLERS ───────────────────────────────────────────
 @app.errorhandler(404)
@@ -499,8 +1667,7 @@ def server_error(e):
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
-    with app.app_context():
-        db.create_all()
+    boot()
     app.run(host="0.0.0.0", port=port, debug=False)
 
 
@@ -0,0 +1,14 @@
+"""ASGI entry point for the async serving mode.
+
+    AI_ASYNC=true uvicorn asgi:asgi_app --workers 2 --port 8000
+
+Flask stays a WSGI app; a2wsgi runs requests on a pool of ASGI_THREADS threads
+while AI calls go through the shared AsyncOpenAI client in ``app.async_ai``.
+"""
+import os
+
+from a2wsgi import WSGIMiddleware
+
+from wsgi import create_app
+
+asgi_app = WSGIMiddleware(create_app(), workers=int(os.getenv("ASGI_THREADS", "32")))
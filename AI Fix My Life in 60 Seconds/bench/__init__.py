@@ -0,0 +1,5 @@
+import os
+
+# Benchmarks push a few users far past production limits: measure the app, not the limiter.
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("AI_DAILY_TOKEN_QUOTA", "0")
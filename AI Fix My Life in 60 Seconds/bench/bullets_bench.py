@@ -0,0 +1,59 @@
+"""Sequential /ai/bullets calls versus one /ai/bullets/batch request.
+
+    python -m bench.bullets_bench --sections 1 4 8 16 --workers 1 4 8 --latency 0.3
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sections", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--latency", type=float, default=0.3, help="stub upstream latency in seconds")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+    import app as webapp
+    from bench.seed import seed
+    from bench.stub_client import StubOpenAI
+
+    webapp.AI_CLIENT, webapp.AI_ENABLED = StubOpenAI(latency=args.latency, reply="• Built things\n• Shipped things"), True
+    webapp.app.config["WTF_CSRF_ENABLED"] = False
+    webapp.app.config["BULLETS_BATCH_MAX"] = max(args.sections)
+    with webapp.app.app_context():
+        webapp.db.create_all()
+        (uid,) = seed(webapp, users=1, items_per_user=0)
+        username = webapp.db.session.get(webapp.User, uid).username
+    client = webapp.app.test_client()
+    client.post("/login", data={"username": username, "password": "benchpass"})
+
+    run = 0
+    for count in args.sections:
+        def payload():
+            # Fresh contexts every run so the completion cache never answers.
+            return [{"section": f"Section {i}", "context": f"run {run} context {i}"} for i in range(count)]
+
+        run += 1
+        started = time.perf_counter()
+        for entry in payload():
+            client.post("/ai/bullets", json=entry)
+        sequential = time.perf_counter() - started
+        print(f"sections={count:3d} sequential       {sequential:6.2f}s  {count / sequential:6.1f} sections/s")
+        for workers in args.workers:
+            run += 1
+            webapp.app.config["BULLETS_BATCH_WORKERS"] = workers
+            started = time.perf_counter()
+            resp = client.post("/ai/bullets/batch", json={"sections": payload()})
+            elapsed = time.perf_counter() - started
+            assert resp.status_code == 200, resp.get_data(as_text=True)
+            print(f"sections={count:3d} batch workers={workers:2d} {elapsed:6.2f}s  {count / elapsed:6.1f} sections/s")
+
+
+if __name__ == "__main__":
+    main()
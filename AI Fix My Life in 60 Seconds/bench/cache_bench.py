@@ -0,0 +1,52 @@
+"""Completion cache benchmark against a local stub client.
+
+    python -m bench.cache_bench --requests 200 --distinct 20 --latency 0.2
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--distinct", type=int, default=20, help="distinct problem texts in the traffic mix")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub upstream latency in seconds")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+    import app as webapp
+    from bench.stub_client import StubOpenAI
+
+    stub = StubOpenAI(latency=args.latency)
+    webapp.AI_CLIENT, webapp.AI_ENABLED = stub, True
+    problems = [f"Problem {i}: boss shouted, cannot focus, deadline at 5pm" for i in range(args.distinct)]
+    rng = random.Random(7)
+    traffic = [rng.choice(problems) for _ in range(args.requests)]
+
+    with webapp.app.app_context():
+        webapp.db.create_all()
+        for label, cached in (("uncached", False), ("cached", True)):
+            webapp.CompletionCacheEntry.query.delete()
+            webapp.db.session.commit()
+            webapp.completion_cache.clear_memory()
+            stub.calls = 0
+            started = time.perf_counter()
+            for text in traffic:
+                if cached:
+                    webapp._generate_fix(text)
+                else:
+                    stub.chat.completions.create(messages=[{"role": "user", "content": webapp._ai_fix_prompt(text)}])
+            elapsed = time.perf_counter() - started
+            print(f"{label:9s} requests={len(traffic)} upstream_calls={stub.calls} "
+                  f"total={elapsed:.2f}s mean={elapsed / len(traffic) * 1000:.1f}ms")
+        print("cache stats:", webapp.completion_cache.stats())
+
+
+if __name__ == "__main__":
+    main()
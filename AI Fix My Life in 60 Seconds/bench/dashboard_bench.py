@@ -0,0 +1,69 @@
+"""Dashboard query and page latency for one heavy user.
+
+Compares the old full load (every Item row, whole blobs) with the keyset page
+query, and times GET /dashboard plus a deep /dashboard/items page.
+
+    python -m bench.dashboard_bench --items 10000 100000 --repeat 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+    import app as webapp
+    from bench.seed import seed
+
+    webapp.app.config["WTF_CSRF_ENABLED"] = False
+    Item = webapp.Item
+    for count in args.items:
+        with webapp.app.app_context():
+            webapp.db.drop_all()
+            webapp.db.create_all()
+            (uid,) = seed(webapp, users=1, items_per_user=count)
+            username = webapp.db.session.get(webapp.User, uid).username
+
+            def full_load():
+                Item.query.filter_by(user_id=uid).order_by(Item.updated_at.desc()).all()
+                webapp.db.session.expunge_all()
+
+            first_page = lambda: webapp._dashboard_page(uid)
+            cursor = None
+            for _ in range(20):
+                cursor = webapp._dashboard_page(uid, cursor)[1]
+            deep_page = lambda: webapp._dashboard_page(uid, cursor)
+
+            print(f"items={count}")
+            print(f"  full load query     {timed(full_load, max(1, args.repeat // 5)):9.2f} ms")
+            print(f"  first page query    {timed(first_page, args.repeat):9.2f} ms")
+            print(f"  page 21 query       {timed(deep_page, args.repeat):9.2f} ms")
+
+        client = webapp.app.test_client()
+        client.post("/login", data={"username": username, "password": "benchpass"})
+        html = client.get("/dashboard").data
+        print(f"  GET /dashboard      {timed(lambda: client.get('/dashboard'), args.repeat):9.2f} ms ({len(html) / 1024:.0f} KiB)")
+        print(f"  GET /dashboard/items {timed(lambda: client.get('/dashboard/items', query_string={'cursor': cursor}), args.repeat):8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
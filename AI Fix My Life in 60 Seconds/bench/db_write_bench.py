@@ -0,0 +1,105 @@
+"""Concurrent write throughput on one SQLite file: default vs production DB profile.
+
+Each profile gets a fresh database and --workers processes (standing in for
+gunicorn workers), each with --threads request threads, all POSTing
+/item/save at once. Background fix jobs run too, as in production, so
+the request writes compete with job writes.
+
+    python -m bench.db_write_bench --workers 4 --threads 4 --writes 200
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+def child(worker: int, threads: int, writes: int, start_at: float):
+    import app as webapp
+
+    webapp.app.config["WTF_CSRF_ENABLED"] = False
+    with webapp.app.app_context():
+        webapp.db.create_all()
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def run(slot):
+        client = webapp.app.test_client()
+        name = f"w{worker}t{slot}"
+        client.post("/signup", data={"username": name, "email": f"{name}@bench.local",
+                                     "password": "benchpass", "confirm_password": "benchpass"})
+        while time.time() < start_at:
+            time.sleep(0.005)
+        for n in range(writes // threads):
+            started = time.perf_counter()
+            resp = client.post("/item/save", json={"title": f"{name}-{n}", "content": f"problem {n} from {name}"})
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.append(elapsed)
+                if resp.status_code >= 400:
+                    errors.append((resp.get_json(silent=True) or {}).get("error", str(resp.status_code))[:80])
+
+    started = time.time()
+    pool = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    webapp.fix_jobs.shutdown(wait=True)
+    print(json.dumps({"latencies": latencies, "errors": errors, "elapsed": time.time() - max(started, start_at)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--writes", type=int, default=200, help="saves per worker")
+    parser.add_argument("--profiles", nargs="+", default=["default", "production"])
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--start-at", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        child(args.child, args.threads, args.writes, args.start_at)
+        return
+
+    print(f"{'profile':<11} {'saves/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for profile in args.profiles:
+        env = dict(os.environ, DB_PROFILE=profile, DATABASE_URL=f"sqlite:///{tempfile.mkdtemp()}/bench.db",
+                   OPENAI_API_KEY="")
+        # Create the schema once so workers do not race on DDL.
+        subprocess.run([sys.executable, "-c", "import app\nwith app.app.app_context(): app.db.create_all()"],
+                       cwd=APP_DIR, env=env, check=True, capture_output=True)
+        start_at = time.time() + 4
+        procs = [
+            subprocess.Popen([sys.executable, "-m", "bench.db_write_bench", "--child", str(w), "--threads", str(args.threads),
+                              "--writes", str(args.writes), "--start-at", str(start_at)],
+                             cwd=APP_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+            for w in range(args.workers)
+        ]
+        latencies, errors, elapsed = [], [], 0.0
+        for proc in procs:
+            out, _ = proc.communicate()
+            result = json.loads(out.strip().splitlines()[-1])
+            latencies += result["latencies"]
+            errors += result["errors"]
+            elapsed = max(elapsed, result["elapsed"])
+        print(f"{profile:<11} {len(latencies) / elapsed:8.1f} {percentile(latencies, 50):8.1f} "
+              f"{percentile(latencies, 95):8.1f} {percentile(latencies, 99):8.1f} {len(errors):>7}")
+        for message in sorted(set(errors))[:3]:
+            print(f"  error: {message}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Local SMTP stand-in for development, tests and benchmarks.
+
+Accepts mail without TLS or auth, keeps every message in memory (and prints
+it with --print), and can add per-message latency or reject a fraction of
+messages to exercise the outbox retry path. Point the app at it with
+``MAIL_SERVER=127.0.0.1 MAIL_PORT=1025 MAIL_USE_TLS=false MAIL_DEFAULT_SENDER=noreply@localhost``.
+
+    python -m bench.debug_smtp --port 1025 --latency 0.2 --fail-rate 0.1 --print
+"""
+import argparse
+import random
+import socketserver
+import threading
+import time
+from email import message_from_bytes, policy
+
+
+class DebugSMTPConfig:
+    def __init__(self, latency: float = 0.0, connect_latency: float = 0.0, fail_rate: float = 0.0,
+                 echo: bool = False, seed: int = None):
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.fail_rate = fail_rate
+        self.echo = echo
+        self.rng = random.Random(seed)
+        self.messages = []
+        self.connections = 0
+        self.lock = threading.Lock()
+
+
+class DebugSMTPHandler(socketserver.StreamRequestHandler):
+    config = DebugSMTPConfig()
+
+    def reply(self, line: str):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        cfg = self.config
+        with cfg.lock:
+            cfg.connections += 1
+        # Stands in for the TCP + TLS + greeting cost a real server charges per connection.
+        time.sleep(cfg.connect_latency)
+        self.reply("220 debug-smtp ready")
+        sender, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("utf-8", "replace").strip()
+            verb = command[:4].upper()
+            if verb == "EHLO":
+                self.wfile.write(b"250-debug-smtp\r\n250-8BITMIME\r\n250 SMTPUTF8\r\n")
+            elif verb == "HELO":
+                self.reply("250 debug-smtp")
+            elif verb == "MAIL":
+                sender, recipients = command.partition(":")[2].strip(), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command.partition(":")[2].strip())
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk in (b".\r\n", b".\n"):
+                        break
+                    lines.append(chunk[1:] if chunk.startswith(b"..") else chunk)
+                time.sleep(cfg.latency)
+                with cfg.lock:
+                    fail = cfg.rng.random() < cfg.fail_rate
+                    if not fail:
+                        cfg.messages.append({"from": sender, "to": recipients, "data": b"".join(lines)})
+                if fail:
+                    self.reply("451 injected temporary failure")
+                else:
+                    self.reply("250 OK queued")
+                    if cfg.echo:
+                        msg = message_from_bytes(b"".join(lines), policy=policy.default)
+                        print(f"--- {msg['Subject']} -> {', '.join(recipients)}\n{msg.get_content().strip()}\n", flush=True)
+            elif verb == "RSET":
+                sender, recipients = None, []
+                self.reply("250 OK")
+            elif verb == "NOOP":
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class DebugSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0, **config):
+    """Start the stand-in on a daemon thread; returns ``(server, port, config)``."""
+    cfg = DebugSMTPConfig(**config)
+    handler = type("Handler", (DebugSMTPHandler,), {"config": cfg})
+    server = DebugSMTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="debug-smtp", daemon=True).start()
+    return server, server.server_address[1], cfg
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per message")
+    parser.add_argument("--connect-latency", type=float, default=0.0, help="seconds per new connection")
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--print", dest="echo", action="store_true", help="print each message")
+    args = parser.parse_args()
+    server, port, _ = start_server(args.host, args.port, latency=args.latency, connect_latency=args.connect_latency,
+                                   fail_rate=args.fail_rate, echo=args.echo)
+    print(f"debug SMTP listening on {args.host}:{port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Peak RSS and time-to-first-byte of /project/export.zip, in-memory vs streaming.
+
+Builds (or reuses) a synthetic project tree, then measures each mode in a
+fresh subprocess so peak RSS is not polluted by earlier runs:
+
+- "inline": the old build, every file deflated into a BytesIO before sending
+- "stream": the streaming export with a cold compressed-entry cache
+- "cached": the streaming export again, served from the warm cache
+
+    python -m bench.export_bench --size-mb 1024
+"""
+import argparse
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+
+def build_tree(root: str, size_mb: int, file_mb: int):
+    """Half compressible text, half random bytes, spread over nested folders."""
+    if os.path.exists(os.path.join(root, ".complete")):
+        return
+    rng = random.Random(7)
+    words = [w.encode() for w in "breathe water walk timer plan focus sleep list call friend".split()]
+    for n in range(max(1, size_mb // file_mb)):
+        folder = os.path.join(root, f"pkg{n % 16}", f"mod{n % 5}")
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"file{n}.dat"), "wb") as f:
+            for _ in range(file_mb):
+                if n % 2:
+                    f.write(os.urandom(1024 * 1024))
+                else:
+                    f.write(b" ".join(rng.choice(words) for _ in range(180000))[:1024 * 1024])
+    open(os.path.join(root, ".complete"), "w").close()
+
+
+def rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(mode: str, root: str, cache_dir: str):
+    os.environ["EXPORT_ROOT"] = root
+    os.environ["EXPORT_CACHE_DIR"] = cache_dir
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+    import app as webapp
+    from bench.seed import seed
+
+    webapp.app.config["WTF_CSRF_ENABLED"] = False
+    with webapp.app.app_context():
+        webapp.db.create_all()
+        (uid,) = seed(webapp, users=1, items_per_user=10, missing_fix=0)
+        username = webapp.db.session.get(webapp.User, uid).username
+    client = webapp.app.test_client()
+    client.post("/login", data={"username": username, "password": "benchpass"})
+    baseline = rss_mb()
+
+    started = time.perf_counter()
+    total = 0
+    if mode == "inline":
+        # The pre-streaming route body.
+        mem = io.BytesIO()
+        with zipfile.ZipFile(mem, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for dirpath, _, filenames in os.walk(root):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    zf.write(path, arcname=os.path.relpath(path, root))
+        ttfb = time.perf_counter() - started
+        total = mem.getbuffer().nbytes
+    else:
+        response = client.get("/project/export.zip", buffered=False)
+        ttfb = None
+        for chunk in response.response:
+            if ttfb is None:
+                ttfb = time.perf_counter() - started
+            total += len(chunk)
+        response.close()
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        "mode": mode, "ttfb_ms": round(ttfb * 1000, 1), "total_s": round(elapsed, 2),
+        "zip_mb": round(total / 1024 / 1024, 1), "peak_rss_mb": round(rss_mb(), 1),
+        "rss_growth_mb": round(rss_mb() - baseline, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=1024)
+    parser.add_argument("--file-mb", type=int, default=8)
+    parser.add_argument("--tree", help="reuse or create the synthetic tree here")
+    parser.add_argument("--modes", nargs="+", default=["inline", "stream", "cached"])
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--cache-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.tree, args.cache_dir)
+        return
+
+    tree = args.tree or os.path.join(tempfile.gettempdir(), f"export-bench-{args.size_mb}mb")
+    started = time.perf_counter()
+    build_tree(tree, args.size_mb, args.file_mb)
+    print(f"tree: {tree} ({args.size_mb} MB, built/checked in {time.perf_counter() - started:.1f}s)")
+    cache_dir = tempfile.mkdtemp(prefix="export-cache-")
+    print(f"{'mode':<8} {'ttfb ms':>10} {'total s':>8} {'zip MB':>8} {'peak RSS MB':>12} {'RSS growth MB':>14}")
+    for mode in args.modes:
+        out = subprocess.run(
+            [sys.executable, "-m", "bench.export_bench", "--child", "stream" if mode == "cached" else mode,
+             "--tree", tree, "--cache-dir", cache_dir],
+            cwd=APP_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip().splitlines()[-1]
+        row = json.loads(out)
+        print(f"{mode:<8} {row['ttfb_ms']:>10} {row['total_s']:>8} {row['zip_mb']:>8} "
+              f"{row['peak_rss_mb']:>12} {row['rss_growth_mb']:>14}")
+
+
+if __name__ == "__main__":
+    main()
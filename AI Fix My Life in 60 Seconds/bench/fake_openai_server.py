@@ -0,0 +1,145 @@
+"""Local OpenAI-compatible HTTP server for benchmarks and offline runs.
+
+Serves POST /v1/chat/completions (plain and ``stream=true``) with configurable
+latency and error injection (``--error-status 429`` to exercise retry paths). Point the app at it with
+``OPENAI_BASE_URL=http://127.0.0.1:<port>/v1 OPENAI_API_KEY=fake``.
+
+    python -m bench.fake_openai_server --port 8765 --latency 0.3 --error-rate 0.05
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = (
+    "Situation: a rough morning, but recoverable.\n"
+    "• Take four slow breaths and drink water\n"
+    "• Pick one task and start a 10 minute timer\n"
+    "• Write a short, factual note about the issue\n"
+    "Motivation: the next hour is yours.\n"
+)
+
+
+class FakeOpenAIConfig:
+    def __init__(self, latency: float = 0.2, jitter: float = 0.0, error_rate: float = 0.0,
+                 chunk_delay: float = 0.01, reply: str = DEFAULT_REPLY, seed: int = None, error_status: int = 500):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.chunk_delay = chunk_delay
+        self.reply = reply
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.lock = threading.Lock()
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = FakeOpenAIConfig()
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            return self._json(200, {"object": "list", "data": [{"id": "gpt-4o-mini", "object": "model"}]})
+        self._json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        cfg = self.config
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self._json(404, {"error": {"message": "not found"}})
+        with cfg.lock:
+            cfg.requests += 1
+            fail = cfg.rng.random() < cfg.error_rate
+            delay = cfg.latency + cfg.rng.uniform(0, cfg.jitter)
+        time.sleep(delay)
+        if fail:
+            kind = "rate_limit_exceeded" if cfg.error_status == 429 else "server_error"
+            return self._json(cfg.error_status, {"error": {"message": "injected failure", "type": kind}})
+        model = body.get("model", "gpt-4o-mini")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        usage = {"prompt_tokens": len(json.dumps(body.get("messages", []))) // 4,
+                 "completion_tokens": len(cfg.reply) // 4}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        if body.get("stream"):
+            return self._stream(model, completion_id, usage)
+        self._json(200, {
+            "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": cfg.reply}, "finish_reason": "stop"}],
+            "usage": usage,
+        })
+
+    def _stream(self, model: str, completion_id: str, usage: dict):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def send(payload):
+            data = f"data: {payload}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        words = self.config.reply.split(" ")
+        for i, word in enumerate(words):
+            delta = word if i == len(words) - 1 else word + " "
+            send(json.dumps({
+                "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": {"content": delta}, "finish_reason": None}],
+            }))
+            if self.config.chunk_delay:
+                time.sleep(self.config.chunk_delay)
+        send(json.dumps({
+            "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage,
+        }))
+        send("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0, **config):
+    """Start the fake server on a daemon thread; returns ``(server, base_url)``."""
+    handler = type("Handler", (FakeOpenAIHandler,), {"config": FakeOpenAIConfig(**config)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--chunk-delay", type=float, default=0.01)
+    args = parser.parse_args()
+    server, url = start_server(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                               error_rate=args.error_rate, error_status=args.error_status,
+                               chunk_delay=args.chunk_delay)
+    print(f"fake OpenAI listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
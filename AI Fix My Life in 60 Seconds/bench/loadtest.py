@@ -0,0 +1,175 @@
+"""Load test sync vs async serving modes against the local fake OpenAI server.
+
+Each mode boots the app in a subprocess (gunicorn sync workers, gunicorn
+gthread + AI_ASYNC, or uvicorn + AI_ASYNC), logs in once and hammers
+/ai/bullets with unique contexts so the completion cache never answers.
+
+    python -m bench.loadtest --modes sync async asgi --concurrency 32 --duration 15 --latency 0.5
+"""
+import argparse
+import http.client
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from urllib.parse import urlencode
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+MODES = {
+    "sync": (["gunicorn", "app:app", "-w", "{workers}", "-b", "127.0.0.1:{port}"], {"AI_ASYNC": "false"}),
+    "async": (["gunicorn", "app:app", "-w", "{workers}", "-k", "gthread", "--threads", "{threads}",
+               "-b", "127.0.0.1:{port}"], {"AI_ASYNC": "true"}),
+    "asgi": (["uvicorn", "asgi:asgi_app", "--workers", "{workers}", "--port", "{port}", "--log-level", "warning"],
+             {"AI_ASYNC": "true"}),
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 20.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+class Session:
+    """Minimal cookie-keeping HTTP client; one connection per request so sync workers are measured fairly."""
+
+    def __init__(self, port: int):
+        self.port = port
+        self.cookies = {}
+        self.csrf = None
+
+    def request(self, method: str, path: str, body=None, headers=None, timeout: float = 120):
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=timeout)
+        headers = dict(headers or {})
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        conn.request(method, path, body=body, headers=headers)
+        resp = conn.getresponse()
+        data = resp.read()
+        for header, value in resp.getheaders():
+            if header.lower() == "set-cookie":
+                name, _, rest = value.partition("=")
+                self.cookies[name] = rest.split(";", 1)[0]
+        conn.close()
+        return resp.status, data
+
+    def token(self, path: str) -> str:
+        _, page = self.request("GET", path)
+        match = re.search(rb'name="csrf_token" value="([^"]+)"', page) or re.search(rb'csrfToken = "([^"]+)"', page)
+        return match.group(1).decode() if match else ""
+
+    def form(self, path: str, fields: dict):
+        fields = dict(fields, csrf_token=self.token(path))
+        return self.request("POST", path, urlencode(fields), {"Content-Type": "application/x-www-form-urlencoded"})
+
+    def post_json(self, path: str, payload: dict):
+        headers = {"Content-Type": "application/json", "X-CSRFToken": self.csrf}
+        return self.request("POST", path, json.dumps(payload), headers)
+
+    def signup_and_login(self, username: str, password: str = "loadtest1"):
+        self.form("/signup", {"username": username, "email": f"{username}@example.com",
+                              "password": password, "confirm_password": password})
+        self.form("/login", {"username": username, "password": password})
+        self.csrf = self.token("/item/new")
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+def drive(session: Session, concurrency: int, duration: float) -> dict:
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.time() + duration
+
+    def worker():
+        while time.time() < deadline:
+            started = time.perf_counter()
+            try:
+                status, _ = session.post_json("/ai/bullets", {"section": "Experience", "context": uuid.uuid4().hex})
+                ok = status == 200
+            except OSError:
+                ok = False
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.time() - started
+    return {"requests": len(latencies), "errors": errors[0], "rps": len(latencies) / wall,
+            "p50": percentile(latencies, 50), "p95": percentile(latencies, 95), "p99": percentile(latencies, 99)}
+
+
+def run_mode(mode: str, args, openai_url: str) -> dict:
+    command, extra_env = MODES[mode]
+    port = free_port()
+    workdir = tempfile.mkdtemp(prefix=f"loadtest-{mode}-")
+    env = dict(os.environ, OPENAI_API_KEY="fake-key", OPENAI_BASE_URL=openai_url,
+               DATABASE_URL=f"sqlite:///{workdir}/app.db", **extra_env)
+    subprocess.run([sys.executable, "-c", "import app\nwith app.app.app_context(): app.db.create_all()"],
+                   cwd=APP_DIR, env=env, check=True, capture_output=True)
+    argv = [part.format(workers=args.workers, threads=args.threads, port=port) for part in command]
+    proc = subprocess.Popen(argv, cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(port)
+        session = Session(port)
+        session.signup_and_login(f"load{mode}")
+        drive(session, min(4, args.concurrency), 1.0)  # warm-up
+        return drive(session, args.concurrency, args.duration)
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"], choices=sorted(MODES))
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=32, help="gthread threads per worker (async mode)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--latency", type=float, default=0.5, help="fake OpenAI latency in seconds")
+    args = parser.parse_args()
+
+    from bench.fake_openai_server import start_server
+
+    server, url = start_server(latency=args.latency)
+    try:
+        for mode in args.modes:
+            r = run_mode(mode, args, url)
+            print(f"{mode:6s} workers={args.workers} concurrency={args.concurrency} requests={r['requests']} "
+                  f"errors={r['errors']} rps={r['rps']:.1f} p50={r['p50']:.0f}ms p95={r['p95']:.0f}ms p99={r['p99']:.0f}ms")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Mail cost on the request path: inline SMTP per request vs the outbox.
+
+The debug SMTP stand-in charges --connect-latency per new connection (TCP,
+TLS and greeting on a real server) and --latency per message. "inline" sends
+each mail on a fresh connection inside POST /forgot-password, as the old
+direct send did; "outbox" queues a row and lets the background sender
+deliver over one reused connection.
+
+    python -m bench.mail_bench --mails 50 --connect-latency 0.3 --latency 0.05
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.debug_smtp import start_server  # noqa: E402
+from bench.loadtest import percentile  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mails", type=int, default=50)
+    parser.add_argument("--connect-latency", type=float, default=0.3)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    server, port, smtp = start_server(latency=args.latency, connect_latency=args.connect_latency)
+    os.environ.update(DATABASE_URL=f"sqlite:///{tempfile.mkdtemp()}/bench.db", MAIL_SERVER="127.0.0.1",
+                      MAIL_PORT=str(port), MAIL_USE_TLS="false", MAIL_DEFAULT_SENDER="bench@localhost")
+    import app as webapp
+    from email.message import EmailMessage
+    from mail_outbox import SMTPSender
+
+    webapp.app.config["WTF_CSRF_ENABLED"] = False
+    with webapp.app.app_context():
+        webapp.db.create_all()
+        webapp.db.session.add(webapp.User(username="mailbench", email="mailbench@bench.local",
+                                          password=webapp.passwords.hash("benchpass"), is_verified=True))
+        webapp.db.session.commit()
+    queued_send = webapp._send_mail
+
+    def inline_send(to_email, subject, body):
+        message = EmailMessage()
+        message["From"], message["To"], message["Subject"] = "bench@localhost", to_email, subject
+        message.set_content(body)
+        sender = SMTPSender("127.0.0.1", port, use_tls=False)
+        sender.send(message)
+        sender.close()
+        return True
+
+    print(f"{'mode':<8} {'req p50 ms':>11} {'req p95 ms':>11} {'all sent s':>11} {'connections':>12}")
+    for mode, send in (("inline", inline_send), ("outbox", queued_send)):
+        webapp._send_mail = send
+        delivered, connections = len(smtp.messages), smtp.connections
+        client = webapp.app.test_client()
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(args.mails):
+            t0 = time.perf_counter()
+            resp = client.post("/forgot-password", data={"email": "mailbench@bench.local"})
+            assert resp.status_code == 302, resp.status_code
+            latencies.append((time.perf_counter() - t0) * 1000)
+        while len(smtp.messages) - delivered < args.mails:
+            time.sleep(0.01)
+        total = time.perf_counter() - started
+        print(f"{mode:<8} {percentile(latencies, 50):11.1f} {percentile(latencies, 95):11.1f} "
+              f"{total:11.2f} {smtp.connections - connections:12d}")
+    webapp.mail_outbox.stop()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Logins per second per core for each password-hashing setting.
+
+For every method this measures raw verifications/sec on one thread (the
+per-core figure), verifications/sec through the hashing pool with
+``--threads`` workers, and full POST /login round-trips/sec through the app.
+
+    python -m bench.password_bench --threads 4 --seconds 3
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+METHODS = [
+    "pbkdf2:sha256:1000000",
+    "pbkdf2:sha256:600000",
+    "pbkdf2:sha256:210000",
+    "scrypt:32768:8:1",
+    "scrypt:16384:8:1",
+    "argon2:3:65536:4",
+    "argon2:2:19456:1",
+]
+
+
+def rate(fn, seconds: float, threads: int = 1) -> float:
+    done = [0] * threads
+    stop = time.perf_counter() + seconds
+
+    def loop(slot):
+        while time.perf_counter() < stop:
+            fn()
+            done[slot] += 1
+
+    workers = [threading.Thread(target=loop, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return sum(done) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--methods", nargs="+", default=METHODS)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+    import app as webapp
+    from passwords import ARGON2_OK, PasswordHasher
+
+    webapp.app.config["WTF_CSRF_ENABLED"] = False
+    with webapp.app.app_context():
+        webapp.db.create_all()
+
+    print(f"{'method':<24} {'1 core/s':>9} {f'pool x{args.threads}/s':>12} {'POST /login/s':>14}")
+    for n, method in enumerate(args.methods):
+        if method.startswith("argon2") and not ARGON2_OK:
+            print(f"{method:<24} skipped (pip install argon2-cffi)")
+            continue
+        hasher = PasswordHasher(method, workers=args.threads)
+        stored = hasher.hash("benchpass")
+        per_core = rate(lambda: hasher.verify(stored, "benchpass"), args.seconds)
+        pooled = rate(lambda: hasher.verify(stored, "benchpass"), args.seconds, threads=args.threads * 2)
+
+        webapp.passwords = hasher
+        username = f"bench{n}"
+        with webapp.app.app_context():
+            webapp.db.session.add(webapp.User(username=username, email=f"{username}@bench.local",
+                                              password=stored, is_verified=True))
+            webapp.db.session.commit()
+
+        def login():
+            client = webapp.app.test_client()
+            resp = client.post("/login", data={"username": username, "password": "benchpass"})
+            assert resp.status_code == 302 and "/dashboard" in resp.headers["Location"], resp.status_code
+
+        logins = rate(login, args.seconds)
+        hasher.shutdown()
+        print(f"{method:<24} {per_core:9.1f} {pooled:12.1f} {logins:14.1f}")
+
+
+if __name__ == "__main__":
+    main()
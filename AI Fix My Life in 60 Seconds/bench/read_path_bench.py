@@ -0,0 +1,79 @@
+"""GET /item/<id> latency with and without the inline AI backfill.
+
+"inline" replays the old read path (model call + commit inside the GET);
+"pipeline" is the current view, with fixes left to `flask backfill-fixes`.
+
+    python -m bench.read_path_bench --items 100000 --requests 500 --latency 0.3
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--missing-fix", type=float, default=0.3)
+    parser.add_argument("--latency", type=float, default=0.3, help="stub upstream latency in seconds")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+    import app as webapp
+    from bench.seed import seed
+    from bench.stub_client import StubOpenAI
+
+    webapp.AI_CLIENT, webapp.AI_ENABLED = StubOpenAI(latency=args.latency), True
+    webapp.app.config["WTF_CSRF_ENABLED"] = False
+    with webapp.app.app_context():
+        webapp.db.create_all()
+        (uid,) = seed(webapp, users=1, items_per_user=args.items, missing_fix=args.missing_fix)
+        ids = [i for (i,) in webapp.db.session.query(webapp.Item.id).filter_by(user_id=uid)]
+        username = webapp.db.session.get(webapp.User, uid).username
+
+    def inline_backfill(item_id):
+        # The pre-pipeline view: generate and commit before rendering.
+        item = webapp.db.session.get(webapp.Item, item_id)
+        if item.ai_fix is None and item.content:
+            item.ai_fix, item.fix_source = webapp._generate_fix(item.content)
+            item.fix_status = "ready"
+            webapp.db.session.commit()
+
+    rng = random.Random(1)
+    sample = [rng.choice(ids) for _ in range(args.requests)]
+    for mode in ("inline", "pipeline"):
+        client = webapp.app.test_client()
+        client.post("/login", data={"username": username, "password": "benchpass"})
+        webapp.completion_cache.clear_memory()
+        timings = []
+        for item_id in sample:
+            started = time.perf_counter()
+            if mode == "inline":
+                with webapp.app.app_context():
+                    inline_backfill(item_id)
+            resp = client.get(f"/item/{item_id}")
+            timings.append((time.perf_counter() - started) * 1000)
+            assert resp.status_code == 200, resp.status_code
+        print(f"{mode:8s} n={len(timings)} p50={percentile(timings, 50):.1f}ms "
+              f"p95={percentile(timings, 95):.1f}ms p99={percentile(timings, 99):.1f}ms")
+        if mode == "inline":
+            # Reset the rows the inline pass filled so both modes see the same data.
+            with webapp.app.app_context():
+                webapp.db.drop_all()
+                webapp.db.create_all()
+                (uid,) = seed(webapp, users=1, items_per_user=args.items, missing_fix=args.missing_fix)
+                username = webapp.db.session.get(webapp.User, uid).username
+
+
+if __name__ == "__main__":
+    main()
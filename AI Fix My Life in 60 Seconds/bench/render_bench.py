@@ -0,0 +1,65 @@
+"""Per-request render time for /dashboard and /item/<id> across render modes.
+
+- "dev": template auto-reload on, no card fragment cache (the old behaviour)
+- "prod": templates compiled once, card fragments cached
+- "304": prod plus If-None-Match revalidation, answered without rendering
+
+    python -m bench.render_bench --items 1000 --requests 300
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+    import app as webapp
+    from bench.seed import seed
+
+    webapp.app.config["WTF_CSRF_ENABLED"] = False
+    with webapp.app.app_context():
+        webapp.db.create_all()
+        (uid,) = seed(webapp, users=1, items_per_user=args.items, missing_fix=0)
+        username = webapp.db.session.get(webapp.User, uid).username
+        item_id = webapp.db.session.query(webapp.db.func.max(webapp.Item.id)).scalar()
+    client = webapp.app.test_client()
+    client.post("/login", data={"username": username, "password": "benchpass"})
+    client.get("/dashboard")  # consume the login flash
+    max_entries = webapp.card_fragments.max_entries
+
+    print(f"{'page':<12} {'mode':<5} {'mean ms':>9} {'p95 ms':>9} {'status':>7}")
+    for path in ("/dashboard", f"/item/{item_id}"):
+        for mode in ("dev", "prod", "304"):
+            webapp.app.jinja_env.auto_reload = mode == "dev"
+            webapp.card_fragments.max_entries = 0 if mode == "dev" else max_entries
+            webapp.card_fragments.clear()
+            headers = {}
+            if mode == "304":
+                headers["If-None-Match"] = client.get(path).headers.get("ETag", "")
+            samples, status = [], None
+            for _ in range(args.requests):
+                started = time.perf_counter()
+                status = client.get(path, headers=headers).status_code
+                samples.append((time.perf_counter() - started) * 1000)
+            label = "/item/<id>" if path.startswith("/item") else path
+            print(f"{label:<12} {mode:<5} {statistics.mean(samples):9.2f} {percentile(samples, 95):9.2f} {status:>7}")
+    print("fragment cache:", webapp.card_fragments.stats())
+
+
+if __name__ == "__main__":
+    main()
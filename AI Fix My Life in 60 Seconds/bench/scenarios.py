@@ -0,0 +1,250 @@
+"""End-to-end scenario suite and regression gate, runnable offline on one box.
+
+Starts the fake OpenAI server, seeds a fresh database (``bench.seed``), boots
+the app under gunicorn and drives each scripted scenario for ``--duration``
+seconds, reporting throughput and p50/p95/p99 latency per scenario:
+
+    signup_login   sign up a new account, log out, log back in
+    dashboard      first dashboard page plus two keyset pages of cards
+    save_with_fix  save a session and poll its fix job until the fix is ready
+    view_backfill  open a seeded session; request the fix when it has none
+    bullets        /ai/bullets with a unique context (no cache hits)
+    export         download the whole project ZIP
+
+``--save`` writes the results as JSON; ``--baseline`` compares a run against
+saved results and exits non-zero when a scenario's p95 grew or its
+throughput fell by more than ``--tolerance``.
+
+    python -m bench.scenarios --duration 10 --save bench-baseline.json
+    python -m bench.scenarios --baseline bench-baseline.json --tolerance 0.2
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from urllib.parse import urlencode
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from bench.loadtest import Session, free_port, percentile, wait_for_port  # noqa: E402
+
+PASSWORD = "benchpass"
+
+
+class Client:
+    """One logged-in seeded user plus the ids of the sessions it owns."""
+
+    def __init__(self, port: int, username: str, item_ids: range, seed: int):
+        self.port = port
+        self.username = username
+        self.item_ids = item_ids
+        self.rng = random.Random(seed)
+        self.session = Session(port)
+
+    def login(self):
+        self.session.form("/login", {"username": self.username, "password": PASSWORD})
+        self.session.csrf = self.session.token("/item/new")
+        if not self.session.csrf:
+            raise RuntimeError(f"could not log in as {self.username}")
+
+
+def signup_login(client: Client) -> bool:
+    session, name = Session(client.port), f"s{uuid.uuid4().hex[:12]}"
+    status, _ = session.form("/signup", {"username": name, "email": f"{name}@bench.local",
+                                         "password": PASSWORD, "confirm_password": PASSWORD})
+    if status != 302:
+        return False
+    session.request("GET", "/logout")
+    status, _ = session.form("/login", {"username": name, "password": PASSWORD})
+    return status == 302
+
+
+def dashboard(client: Client) -> bool:
+    status, _ = client.session.request("GET", "/dashboard")
+    if status != 200:
+        return False
+    cursor = ""
+    for _ in range(2):
+        status, body = client.session.request("GET", f"/dashboard/items?{urlencode({'cursor': cursor})}" if cursor else "/dashboard/items")
+        if status != 200:
+            return False
+        cursor = json.loads(body).get("next_cursor")
+        if not cursor:
+            break
+    return True
+
+
+def save_with_fix(client: Client, timeout: float = 30.0) -> bool:
+    status, body = client.session.post_json("/item/save", {
+        "title": "Bench session", "content": f"Deadline moved up and my laptop died ({uuid.uuid4().hex})"})
+    if status != 202:
+        return False
+    job_id = json.loads(body)["job"]["id"]
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status, body = client.session.request("GET", f"/ai/jobs/{job_id}")
+        if status != 200:
+            return False
+        state = json.loads(body)["status"]
+        if state in {"done", "failed"}:
+            return state == "done"
+        time.sleep(0.02)
+    return False
+
+
+def view_backfill(client: Client) -> bool:
+    item_id = client.rng.choice(client.item_ids)
+    status, page = client.session.request("GET", f"/item/{item_id}")
+    if status != 200:
+        return False
+    if f'action="/item/{item_id}/fix"'.encode() in page:
+        status, _ = client.session.request("POST", f"/item/{item_id}/fix", urlencode({"csrf_token": client.session.csrf}),
+                                           {"Content-Type": "application/x-www-form-urlencoded"})
+        return status == 302
+    return True
+
+
+def bullets(client: Client) -> bool:
+    status, _ = client.session.post_json("/ai/bullets", {"section": "Experience", "context": uuid.uuid4().hex})
+    return status == 200
+
+
+def export(client: Client) -> bool:
+    status, body = client.session.request("GET", "/project/export.zip")
+    return status == 200 and body[:2] == b"PK"
+
+
+# name -> (scenario, concurrency cap); export is capped because each download walks the whole tree.
+SCENARIOS = {
+    "signup_login": (signup_login, None),
+    "dashboard": (dashboard, None),
+    "save_with_fix": (save_with_fix, None),
+    "view_backfill": (view_backfill, None),
+    "bullets": (bullets, None),
+    "export": (export, 2),
+}
+
+
+def drive(fn, clients: list, duration: float) -> dict:
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.time() + duration
+
+    def worker(client):
+        while time.time() < deadline:
+            started = time.perf_counter()
+            try:
+                ok = fn(client)
+            except (OSError, ValueError, KeyError):
+                ok = False
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=worker, args=(c,)) for c in clients]
+    started = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.time() - started
+    return {"requests": len(latencies), "errors": errors[0], "rps": len(latencies) / wall,
+            "p50": percentile(latencies, 50), "p95": percentile(latencies, 95), "p99": percentile(latencies, 99)}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for name, now in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if now["p95"] > before["p95"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95']:.0f} -> {now['p95']:.0f} ms")
+        if now["rps"] < before["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {before['rps']:.1f} -> {now['rps']:.1f} ops/s")
+        if now["errors"] and not before["errors"]:
+            regressions.append(f"{name}: {now['errors']} errors (baseline had none)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="simulated users per scenario")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers")
+    parser.add_argument("--threads", type=int, default=8, help="gthread threads per worker")
+    parser.add_argument("--items-per-user", type=int, default=500)
+    parser.add_argument("--missing-fix", type=float, default=0.3, help="fraction of seeded items without a fix")
+    parser.add_argument("--ai-latency", type=float, default=0.2, help="fake OpenAI latency in seconds")
+    parser.add_argument("--ai-error-rate", type=float, default=0.0)
+    parser.add_argument("--ai-error-status", type=int, default=500)
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against results saved with --save")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args()
+
+    from bench.fake_openai_server import start_server
+
+    ai_server, ai_url = start_server(latency=args.ai_latency, error_rate=args.ai_error_rate,
+                                     error_status=args.ai_error_status, seed=1)
+    workdir = tempfile.mkdtemp(prefix="bench-scenarios-")
+    env = dict(os.environ, OPENAI_API_KEY="fake-key", OPENAI_BASE_URL=ai_url,
+               DATABASE_URL=f"sqlite:///{workdir}/app.db", EXPORT_CACHE_DIR=os.path.join(workdir, "export-cache"))
+    subprocess.run([sys.executable, "-m", "bench.seed", "--users", str(args.concurrency),
+                    "--items-per-user", str(args.items_per_user), "--missing-fix", str(args.missing_fix)],
+                   cwd=APP_DIR, env=env, check=True, capture_output=True)
+
+    port = free_port()
+    log_path = os.path.join(workdir, "server.log")
+    with open(log_path, "wb") as log:
+        proc = subprocess.Popen(["gunicorn", "-c", "gunicorn.conf.py", "wsgi:create_app()", "-k", "gthread", "-w", str(args.workers), "--threads",
+                                 str(args.threads), "-b", f"127.0.0.1:{port}"],
+                                cwd=APP_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    results = {}
+    try:
+        wait_for_port(port)
+        clients = [Client(port, f"bench{n}", range(n * args.items_per_user + 1, (n + 1) * args.items_per_user + 1), n)
+                   for n in range(args.concurrency)]
+        for client in clients:
+            client.login()
+
+        print(f"{'scenario':<14} {'users':>5} {'ops':>6} {'errors':>6} {'ops/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for name in args.scenarios:
+            fn, cap = SCENARIOS[name]
+            active = clients[:cap] if cap else clients
+            fn(active[0])  # warm-up: first-hit template compiles and connections
+            r = results[name] = drive(fn, active, args.duration)
+            print(f"{name:<14} {len(active):>5} {r['requests']:>6} {r['errors']:>6} {r['rps']:8.1f} "
+                  f"{r['p50']:8.1f} {r['p95']:8.1f} {r['p99']:8.1f}")
+    finally:
+        proc.terminate()
+        proc.wait(10)
+        ai_server.shutdown()
+    print(f"server log: {log_path}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Full-text search latency on a seeded database.
+
+    python -m bench.search_bench --users 100 --items-per-user 10000 --queries 200
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+QUERIES = ["boss", "focus report", "exam notes", "gym", "inbox", "slept", "deadline", "friend mood", "phone scroll"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--items-per-user", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+    import app as webapp
+    from bench.seed import seed
+
+    with webapp.app.app_context():
+        webapp.db.create_all()
+        started = time.perf_counter()
+        user_ids = seed(webapp, users=args.users, items_per_user=args.items_per_user)
+        print(f"seeded {args.users * args.items_per_user} items in {time.perf_counter() - started:.1f}s")
+        max_id = webapp.db.session.query(webapp.db.func.max(webapp.Item.id)).scalar()
+        webapp.db.session.remove()
+        started = time.perf_counter()
+        webapp.search_index.reindex(webapp.db.engine.connect, max_id)
+        print(f"reindexed in {time.perf_counter() - started:.1f}s "
+              f"backend={webapp.search_index.backend(webapp.db.session.connection()).name}")
+
+        rng = random.Random(3)
+        conn = webapp.db.session.connection()
+        for label, offset in (("page 1", 0), ("page 5", 80)):
+            samples = []
+            for _ in range(args.queries):
+                started = time.perf_counter()
+                webapp.search_index.search(conn, rng.choice(user_ids), rng.choice(QUERIES), limit=21, offset=offset)
+                samples.append((time.perf_counter() - started) * 1000)
+            samples.sort()
+            print(f"{label}: n={len(samples)} p50={statistics.median(samples):.2f}ms "
+                  f"p95={samples[int(len(samples) * .95)]:.2f}ms p99={samples[int(len(samples) * .99)]:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Seed a database with users and items for benchmarks.
+
+    python -m bench.seed --users 10 --items-per-user 10000 --missing-fix 0.5
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROBLEMS = [
+    "Boss shouted in the standup and I cannot focus on the report due at 5pm",
+    "Slept three hours, missed the gym and feel behind on everything",
+    "Argument with a friend this morning, mood is off and the inbox is overflowing",
+    "Exam tomorrow, notes are a mess and I keep scrolling my phone",
+]
+
+
+def seed(webapp, users: int = 1, items_per_user: int = 1000, missing_fix: float = 0.0,
+         password: str = "benchpass", chunk: int = 5000, rng_seed: int = 42) -> list:
+    """Insert users and items with bulk Core inserts; returns the created user ids."""
+    from werkzeug.security import generate_password_hash
+
+    db, User, Item = webapp.db, webapp.User, webapp.Item
+    rng = random.Random(rng_seed)
+    hashed = generate_password_hash(password, method="pbkdf2:sha256")
+    offset = db.session.query(db.func.count(User.id)).scalar()
+    user_ids = []
+    for n in range(users):
+        user = User(username=f"bench{offset + n}", email=f"bench{offset + n}@example.com",
+                    password=hashed, is_verified=True)
+        db.session.add(user)
+        db.session.flush()
+        user_ids.append(user.id)
+    db.session.commit()
+
+    now = datetime.utcnow()
+    rows = []
+    for uid in user_ids:
+        for i in range(items_per_user):
+            content = f"{rng.choice(PROBLEMS)} (#{i})"
+            ai_fix = webapp._local_60sec_fix(content) if rng.random() >= missing_fix else None
+            stamp = now - timedelta(minutes=items_per_user - i)
+            rows.append({"title": f"Session {i}", "content": content, "ai_fix": ai_fix,
+                         "fix_status": "ready" if ai_fix else "none", "fix_source": "local" if ai_fix else None,
+                         "content_hash": webapp._content_hash(content), "data": "{}",
+                         "created_at": stamp, "updated_at": stamp, "user_id": uid})
+            if len(rows) >= chunk:
+                db.session.execute(Item.__table__.insert(), rows)
+                db.session.commit()
+                rows = []
+    if rows:
+        db.session.execute(Item.__table__.insert(), rows)
+        db.session.commit()
+    return user_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1)
+    parser.add_argument("--items-per-user", type=int, default=1000)
+    parser.add_argument("--missing-fix", type=float, default=0.0, help="fraction of items without ai_fix")
+    args = parser.parse_args()
+
+    import app as webapp
+    with webapp.app.app_context():
+        webapp.db.create_all()
+        ids = seed(webapp, args.users, args.items_per_user, args.missing_fix)
+    print(f"seeded users={ids} items_per_user={args.items_per_user} into {webapp.app.config['SQLALCHEMY_DATABASE_URI']}")
+
+
+if __name__ == "__main__":
+    main()
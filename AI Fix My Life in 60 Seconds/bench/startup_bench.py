@@ -0,0 +1,146 @@
+"""Cold-start cost: import time, resident memory and gunicorn worker boot.
+
+"import" runs ``import app`` in fresh interpreters, with and without an
+OpenAI key, and reports the median wall time, the extra time to get the AI
+client ready for a first call, and RSS. "boot" starts gunicorn with
+``--workers`` workers, times the first 200 from GET /login, then sums the
+proportional set size (PSS, shared pages split between processes) of the
+master and its workers after a warm-up:
+
+    per-worker  gunicorn app:app, each worker imports the app itself
+    preload     gunicorn -c gunicorn.conf.py 'wsgi:create_app()', workers fork from the master
+
+Point ``--app-dir`` at another checkout to get the numbers for it, e.g. the
+tree before a change (``git worktree add /tmp/before HEAD~1``).
+
+    python -m bench.startup_bench --workers 4 --runs 5
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from bench.loadtest import free_port  # noqa: E402
+
+PROBE = """
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+getattr(app, "_ai_client", lambda: app.AI_CLIENT)()
+ready = time.perf_counter()
+rss = 0
+with open("/proc/self/status") as f:
+    for line in f:
+        if line.startswith("VmRSS:"):
+            rss = int(line.split()[1])
+print(json.dumps({"import": imported - started, "ai_ready": ready - imported, "rss_kb": rss}))
+"""
+
+MODES = {
+    "per-worker": (["gunicorn", "app:app"], {"GUNICORN_PRELOAD": "false"}),
+    "preload": (["gunicorn", "-c", "gunicorn.conf.py", "wsgi:create_app()"], {}),
+}
+
+
+def probe_import(app_dir: str, env: dict, runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", PROBE], cwd=app_dir, env=env, check=True, capture_output=True, text=True)
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+
+
+def get(port: int, path: str) -> int:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        conn.request("GET", path)
+        resp = conn.getresponse()
+        resp.read()
+        return resp.status
+    finally:
+        conn.close()
+
+
+def pss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        return sum(int(line.split()[1]) for line in f if line.startswith("Pss:"))
+
+
+def children(pid: int) -> list:
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+
+def boot(app_dir: str, mode: str, env: dict, workers: int, timeout: float = 60.0) -> dict:
+    command, extra_env = MODES[mode]
+    port = free_port()
+    started = time.perf_counter()
+    proc = subprocess.Popen(command + ["-w", str(workers), "-b", f"127.0.0.1:{port}"], cwd=app_dir,
+                            env=dict(env, **extra_env), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.time() + timeout
+        while True:
+            try:
+                if get(port, "/login") == 200:
+                    break
+            except OSError:
+                pass
+            if time.time() > deadline or proc.poll() is not None:
+                raise RuntimeError(f"{mode} server did not come up")
+            time.sleep(0.02)
+        ready = time.perf_counter() - started
+        # Enough requests that every worker has served pages before memory is measured.
+        for _ in range(10 * workers):
+            get(port, "/login")
+        while len(children(proc.pid)) < workers:
+            time.sleep(0.05)
+        pss = pss_kb(proc.pid) + sum(pss_kb(child) for child in children(proc.pid))
+        return {"ready": ready, "pss_kb": pss}
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app-dir", default=APP_DIR, help="checkout to measure (default: this one)")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters / server boots per measurement")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    args = parser.parse_args()
+    app_dir = os.path.abspath(args.app_dir)
+
+    workdir = tempfile.mkdtemp(prefix="startup-bench-")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{workdir}/app.db", EXPORT_CACHE_DIR=os.path.join(workdir, "export-cache"))
+    env.pop("OPENAI_API_KEY", None)
+    keyed = dict(env, OPENAI_API_KEY="fake-key", OPENAI_BASE_URL="http://127.0.0.1:9/v1")
+    subprocess.run([sys.executable, "-c", "import app\nwith app.app.app_context(): app.db.create_all()"],
+                   cwd=app_dir, env=env, check=True, capture_output=True)
+
+    print(f"{app_dir}")
+    print(f"{'import':<12} {'import ms':>10} {'+AI ready ms':>13} {'RSS MB':>8}")
+    for label, probe_env in (("no key", env), ("with key", keyed)):
+        r = probe_import(app_dir, probe_env, args.runs)
+        print(f"{label:<12} {r['import'] * 1000:10.0f} {r['ai_ready'] * 1000:13.0f} {r['rss_kb'] / 1024:8.1f}")
+
+    print(f"{'boot':<12} {'workers':>10} {'first 200 ms':>13} {'PSS MB':>8}")
+    for mode in args.modes:
+        if mode == "preload" and not os.path.exists(os.path.join(app_dir, "wsgi.py")):
+            print(f"{mode:<12} {'(no wsgi.py in this tree)':>33}")
+            continue
+        samples = [boot(app_dir, mode, keyed, args.workers) for _ in range(args.runs)]
+        print(f"{mode:<12} {args.workers:>10} {statistics.median(s['ready'] for s in samples) * 1000:13.0f} "
+              f"{statistics.median(s['pss_kb'] for s in samples) / 1024:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
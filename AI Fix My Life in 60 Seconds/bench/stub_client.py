@@ -0,0 +1,52 @@
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+
+class StubAPIError(Exception):
+    """Mimics an ``openai.APIStatusError`` closely enough for retry decisions."""
+
+    def __init__(self, status_code: int = 500, message: str = "injected upstream failure"):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class StubOpenAI:
+    """Stand-in for ``openai.OpenAI`` that answers chat completions locally.
+
+    ``latency`` is slept on every call to mimic the upstream round-trip. Faults
+    are injected with ``error_rate`` (raises ``StubAPIError(error_status)``) and
+    ``slow_rate`` (sleeps ``slow_latency`` instead of ``latency``).
+    """
+
+    def __init__(self, latency: float = 0.2, reply: str = "- Breathe\n- Drink water\n- Start a 10 minute timer",
+                 error_rate: float = 0.0, error_status: int = 500, slow_rate: float = 0.0,
+                 slow_latency: float = 5.0, seed: int = None):
+        self.latency = latency
+        self.reply = reply
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model=None, messages=None, max_tokens=None, temperature=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+            fail = self.rng.random() < self.error_rate
+            slow = self.rng.random() < self.slow_rate
+        delay = self.slow_latency if slow else self.latency
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise StubAPIError(self.error_status)
+        message = SimpleNamespace(role="assistant", content=self.reply)
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")],
+            usage=SimpleNamespace(prompt_tokens=len(str(messages)) // 4, completion_tokens=len(self.reply) // 4),
+        )
@@ -0,0 +1,60 @@
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+TRUE_VALUES = {"1", "true", "yes", "on"}
+
+
+def _env(name: str, default: str) -> str:
+    return os.getenv(name, default).strip()
+
+
+def engine_options(uri: str, profile: str = "production") -> dict:
+    """SQLALCHEMY_ENGINE_OPTIONS for ``uri`` under the given profile.
+
+    ``default`` leaves SQLAlchemy's defaults alone. ``production`` gives
+    server databases a sized, pre-pinged, recycled pool; SQLite gets the
+    lock wait as the driver timeout (its pragmas go in via ``sqlite_pragmas``).
+    """
+    if profile != "production":
+        return {}
+    if uri.startswith("sqlite"):
+        return {"connect_args": {"timeout": int(_env("SQLITE_BUSY_TIMEOUT_MS", "5000")) / 1000}}
+    return {
+        "pool_size": int(_env("DB_POOL_SIZE", "5")),
+        "max_overflow": int(_env("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(_env("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(_env("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": _env("DB_POOL_PRE_PING", "true").lower() in TRUE_VALUES,
+    }
+
+
+def sqlite_pragmas(profile: str = "production") -> list:
+    """PRAGMA statements run on every new SQLite connection.
+
+    WAL lets readers proceed while one writer commits, NORMAL sync is
+    durable across application crashes in WAL mode, and busy_timeout makes
+    competing writers wait for the lock instead of failing with
+    "database is locked".
+    """
+    if profile != "production":
+        return []
+    return [
+        f"PRAGMA journal_mode={_env('SQLITE_JOURNAL_MODE', 'WAL')}",
+        f"PRAGMA synchronous={_env('SQLITE_SYNCHRONOUS', 'NORMAL')}",
+        f"PRAGMA busy_timeout={int(_env('SQLITE_BUSY_TIMEOUT_MS', '5000'))}",
+        f"PRAGMA mmap_size={int(_env('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def apply_pragmas(dbapi_connection, pragmas: list):
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in pragmas:
+            cursor.execute(pragma)
+    except Exception as e:
+        logger.warning("SQLite pragma failed: %s", e)
+    finally:
+        cursor.close()
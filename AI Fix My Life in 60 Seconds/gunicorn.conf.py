@@ -0,0 +1,20 @@
+"""Gunicorn settings, picked up from the working directory.
+
+With ``preload_app`` the master imports the app once and forks its workers
+from it, so the import (and the OpenAI SDK) is paid once and its memory is
+shared copy-on-write. Per-process pieces (fix-job threads, the mail sender,
+DB connections, the async AI loop) are started lazily in each worker.
+Set ``GUNICORN_PRELOAD=false`` to import in every worker instead, e.g. to
+pick up code changes on a ``HUP`` reload.
+"""
+import os
+import sys
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def when_ready(server):
+    # Runs in the master after the preload import and just before the first fork.
+    webapp = sys.modules.get("app")
+    if server.cfg.preload_app and webapp is not None:
+        webapp.prefork()
@@ -0,0 +1,138 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+    REDIS_OK = True
+except Exception:
+    redis = None
+    REDIS_OK = False
+
+
+class RedisIdentityBackend:
+    """Shared store so every worker sees an invalidation on its next lookup.
+
+    Keys: ``<prefix>:<uid>:v`` holds the user's version counter and
+    ``<prefix>:<uid>:<version>`` the snapshot written at that version.
+    """
+
+    def __init__(self, url: str, prefix: str = "identity"):
+        self.client = redis.Redis.from_url(url, socket_timeout=0.2)
+        self.prefix = prefix
+
+    def version(self, uid: int) -> int:
+        return int(self.client.get(f"{self.prefix}:{uid}:v") or 0)
+
+    def get(self, uid: int, version: int):
+        raw = self.client.get(f"{self.prefix}:{uid}:{version}")
+        return json.loads(raw) if raw else None
+
+    def set(self, uid: int, version: int, snapshot: dict, ttl: float):
+        self.client.setex(f"{self.prefix}:{uid}:{version}", max(1, int(ttl)), json.dumps(snapshot))
+
+    def bump(self, uid: int):
+        self.client.incr(f"{self.prefix}:{uid}:v")
+
+
+class IdentityCache:
+    """Short-TTL LRU of user snapshots for the login user loader.
+
+    Every entry carries the version it was read at. ``lookup`` returns the
+    snapshot (or None) plus the current version, and ``store`` files a fresh
+    DB read under that version, so a read that races an invalidation is
+    stored under a stale version and never served. With a shared ``backend``
+    the version lives there and other processes notice invalidations
+    immediately; without one, the TTL bounds cross-process staleness.
+    """
+
+    def __init__(self, ttl_seconds: float = 30, max_entries: int = 10000, backend=None):
+        self.ttl_seconds = float(ttl_seconds)
+        self.max_entries = max(0, int(max_entries))
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "shared_hits": 0, "misses": 0, "invalidations": 0}
+
+    def _version(self, uid: int) -> int:
+        if self.backend is not None:
+            try:
+                return self.backend.version(uid)
+            except Exception as e:
+                logger.warning("Identity backend unavailable: %s", e)
+                return -1
+        with self._lock:
+            return self._versions.get(uid, 0)
+
+    def lookup(self, uid: int):
+        if not self.max_entries or not self.ttl_seconds:
+            return None, 0
+        version = self._version(uid)
+        if version < 0:
+            # Shared backend down: nothing cached can be trusted to be current.
+            self._count("misses")
+            return None, version
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(uid)
+            if entry is not None and entry[0] > now and entry[1] == version:
+                self._entries.move_to_end(uid)
+                self.counters["hits"] += 1
+                return dict(entry[2]), version
+        if self.backend is not None:
+            try:
+                snapshot = self.backend.get(uid, version)
+            except Exception as e:
+                logger.warning("Identity backend read failed: %s", e)
+                snapshot = None
+            if snapshot is not None:
+                self._remember(uid, version, snapshot)
+                self._count("shared_hits")
+                return dict(snapshot), version
+        self._count("misses")
+        return None, version
+
+    def store(self, uid: int, snapshot: dict, version: int):
+        if not self.max_entries or not self.ttl_seconds or version < 0:
+            return
+        self._remember(uid, version, snapshot)
+        if self.backend is not None:
+            try:
+                self.backend.set(uid, version, snapshot, self.ttl_seconds)
+            except Exception as e:
+                logger.warning("Identity backend write failed: %s", e)
+
+    def invalidate(self, uid: int):
+        with self._lock:
+            self._entries.pop(uid, None)
+            self._versions[uid] = self._versions.get(uid, 0) + 1
+            self.counters["invalidations"] += 1
+        if self.backend is not None:
+            try:
+                self.backend.bump(uid)
+            except Exception as e:
+                logger.warning("Identity backend invalidation failed: %s", e)
+
+    def _remember(self, uid: int, version: int, snapshot: dict):
+        with self._lock:
+            self._entries[uid] = (time.monotonic() + self.ttl_seconds, version, dict(snapshot))
+            self._entries.move_to_end(uid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counters, "entries": len(self._entries)}
@@ -0,0 +1,190 @@
+import logging
+import os
+import random
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+
+logger = logging.getLogger(__name__)
+
+
+def connection_lost(error: Exception) -> bool:
+    # SMTPException subclasses OSError, so a rejected message must not be mistaken for a dead socket.
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+def server_failed(error: Exception) -> bool:
+    """True for errors that will hit every message in a batch, so the rest is not attempted."""
+    return connection_lost(error) or isinstance(error, (smtplib.SMTPAuthenticationError, smtplib.SMTPNotSupportedError))
+
+
+class SMTPSender:
+    """One persistent SMTP connection, opened on first use and reused across batches.
+
+    The connection is closed after ``idle_timeout`` seconds without a send,
+    before the server would drop it, and reopened transparently.
+    """
+
+    def __init__(self, host: str, port: int = 587, use_tls: bool = True, use_ssl: bool = False,
+                 username: str = "", password: str = "", timeout: float = 10.0, idle_timeout: float = 60.0):
+        self.host, self.port = host, port
+        self.use_tls, self.use_ssl = use_tls, use_ssl
+        self.username, self.password = username, password
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.connects = 0
+        self._conn = None
+        self._last_used = 0.0
+
+    def _connect(self):
+        cls = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        conn = cls(self.host, self.port, timeout=self.timeout)
+        if self.use_tls and not self.use_ssl:
+            conn.starttls()
+        if self.username:
+            conn.login(self.username, self.password)
+        self.connects += 1
+        return conn
+
+    def send(self, message: EmailMessage):
+        if self._conn is not None and time.monotonic() - self._last_used > self.idle_timeout:
+            self.close()
+        for attempt in (1, 2):
+            if self._conn is None:
+                self._conn = self._connect()
+            try:
+                self._conn.send_message(message)
+                return
+            except Exception as e:
+                if not connection_lost(e):
+                    raise
+                # A reused connection may have been dropped by the server; retry once on a fresh one.
+                self.close()
+                if attempt == 2:
+                    raise
+            finally:
+                self._last_used = time.monotonic()
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                conn.quit()
+            except Exception:
+                conn.close()
+
+
+class MailOutbox:
+    """Background drainer for mail rows written to an outbox table.
+
+    Like the fix-job queue, the outbox owns no model code: ``claim(limit)``
+    returns up to ``limit`` due mails as ``(id, to, subject, body)`` tuples
+    and marks them in flight, and ``complete(results)`` records
+    ``(id, error_or_None)`` for each. Both run inside an application context.
+    One daemon thread per process drains the table in batches over a single
+    SMTP connection; ``wake()`` is called after a mail is committed so it goes
+    out immediately rather than at the next poll.
+    """
+
+    def __init__(self, app=None, claim=None, complete=None, sender_factory=None, sender: str = "",
+                 batch_size: int = 20, poll_interval: float = 5.0, observe=None):
+        self.app = None
+        self.claim = claim
+        self.complete = complete
+        self.sender_factory = sender_factory
+        self.sender = sender
+        self.batch_size = max(1, int(batch_size))
+        self.poll_interval = poll_interval
+        self.observe = observe
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, claim, complete)
+
+    def init_app(self, app, claim=None, complete=None):
+        self.app = app
+        self.claim = claim or self.claim
+        self.complete = complete or self.complete
+        app.extensions["mail_outbox"] = self
+
+    def start(self):
+        # Started lazily and per pid, so each forked gunicorn worker gets its own sender thread.
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._stop.clear()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._loop, name="mail-outbox", daemon=True)
+                self._thread.start()
+
+    def wake(self):
+        self.start()
+        self._wake.set()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self):
+        sender = self.sender_factory()
+        try:
+            while not self._stop.is_set():
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                # Keep draining while batches come back full.
+                while not self._stop.is_set() and self.drain(sender) >= self.batch_size:
+                    pass
+        finally:
+            sender.close()
+
+    def drain(self, sender) -> int:
+        """Send one batch; returns how many mails were claimed."""
+        try:
+            with self.app.app_context():
+                batch = self.claim(self.batch_size)
+        except Exception:
+            logger.exception("Mail outbox claim failed")
+            return 0
+        results, server_error = [], None
+        for mail_id, to_email, subject, body in batch:
+            if server_error is not None:
+                results.append((mail_id, server_error))
+                continue
+            message = EmailMessage()
+            message["From"], message["To"], message["Subject"] = self.sender, to_email, subject
+            message.set_content(body)
+            started = time.perf_counter()
+            try:
+                sender.send(message)
+                error = None
+            except Exception as e:
+                logger.warning("Mail %s to %s failed: %s", mail_id, to_email, e)
+                error = e
+                if server_failed(e):
+                    server_error = e
+            if self.observe is not None:
+                self.observe(time.perf_counter() - started, "error" if error else "sent")
+            results.append((mail_id, error))
+        if results:
+            try:
+                with self.app.app_context():
+                    self.complete(results)
+            except Exception:
+                logger.exception("Mail outbox could not record %s results", len(results))
+        return len(batch)
+
+
+def retry_delay(attempts: int, base: float = 30.0, cap: float = 3600.0) -> float:
+    """Jittered exponential backoff after the ``attempts``-th failure: half fixed, half random."""
+    delay = min(cap, base * 2 ** max(0, attempts - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
@@ -0,0 +1,115 @@
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+logger = logging.getLogger(__name__)
+
+try:
+    from argon2 import PasswordHasher as Argon2Hasher
+    from argon2.exceptions import InvalidHashError, VerificationError
+    ARGON2_OK = True
+except Exception:
+    Argon2Hasher = None
+    ARGON2_OK = False
+
+DEFAULT_METHOD = f"pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}"
+
+
+def normalize_method(method: str) -> str:
+    """Spell out Werkzeug's implied costs so the method matches a stored hash prefix."""
+    name, *args = (method or DEFAULT_METHOD).strip().split(":")
+    if name == "pbkdf2":
+        hash_name = args[0] if args else "sha256"
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{iterations}"
+    if name == "scrypt":
+        n, r, p = (args + ["32768", "8", "1"][len(args):])[:3]
+        return f"scrypt:{int(n)}:{int(r)}:{int(p)}"
+    return ":".join([name] + args)
+
+
+def _argon2(method: str):
+    # "argon2:<time_cost>:<memory_kib>:<parallelism>"; missing parts use argon2-cffi's defaults.
+    parts = [int(p) for p in method.split(":")[1:] if p]
+    names = ("time_cost", "memory_cost", "parallelism")
+    return Argon2Hasher(**dict(zip(names, parts)))
+
+
+def _hash(method: str, password: str) -> str:
+    if method.startswith("argon2"):
+        return _argon2(method).hash(password)
+    return generate_password_hash(password, method=method)
+
+
+def _verify(method: str, stored: str, password: str) -> bool:
+    if stored.startswith("$argon2"):
+        if not ARGON2_OK:
+            logger.warning("argon2 hash found but argon2-cffi is not installed")
+            return False
+        try:
+            return _argon2(method if method.startswith("argon2") else "argon2").verify(stored, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    return check_password_hash(stored, password)
+
+
+class PasswordHasher:
+    """Configurable password hashing, run on a bounded pool.
+
+    ``method`` is a Werkzeug method string with its cost spelled out
+    (``pbkdf2:sha256:600000``, ``scrypt:32768:8:1``) or
+    ``argon2:<time_cost>:<memory_kib>:<parallelism>`` when argon2-cffi is
+    installed. Hashes made with any other parameters still verify and are
+    reported by ``needs_rehash`` so login can upgrade them.
+
+    The pool caps how many cores hashing can take at once; hashlib and
+    argon2 release the GIL, so a thread pool is enough under gthread/ASGI
+    workers, while ``pool="process"`` suits sync workers.
+    """
+
+    def __init__(self, method: str = DEFAULT_METHOD, workers: int = 2, pool: str = "thread"):
+        if method.startswith("argon2") and not ARGON2_OK:
+            logger.warning("PASSWORD_HASH_METHOD=%s needs argon2-cffi; using %s", method, DEFAULT_METHOD)
+            method = DEFAULT_METHOD
+        self.method = normalize_method(method)
+        self.workers = max(1, int(workers))
+        self.pool = pool
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        # Per process: a forked worker must not reuse the parent's executor.
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                factory = ProcessPoolExecutor if self.pool == "process" else ThreadPoolExecutor
+                self._executor = factory(max_workers=self.workers)
+                self._pid = os.getpid()
+            return self._executor
+
+    def hash(self, password: str) -> str:
+        return self._pool().submit(_hash, self.method, password).result()
+
+    def verify(self, stored: str, password: str) -> bool:
+        if not stored:
+            return False
+        return self._pool().submit(_verify, self.method, stored, password).result()
+
+    def needs_rehash(self, stored: str) -> bool:
+        if self.method.startswith("argon2"):
+            if not stored.startswith("$argon2"):
+                return True
+            try:
+                return _argon2(self.method).check_needs_rehash(stored)
+            except InvalidHashError:
+                return True
+        return stored.split("$", 1)[0] != self.method
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=True)
+            self._executor = None
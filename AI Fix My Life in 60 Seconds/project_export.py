@@ -0,0 +1,307 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import struct
+import tempfile
+import threading
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 256 * 1024
+ZIP64_LIMIT = 0xFFFFFFFF
+# Already-compressed formats are stored as-is; deflating them again only burns CPU.
+STORED_SUFFIXES = {".zip", ".gz", ".bz2", ".xz", ".7z", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".pdf", ".mp4", ".woff2"}
+SQLITE_SIDE_FILES = ("-wal", "-shm", "-journal")
+
+
+def _dos_datetime(timestamp: float):
+    t = time.localtime(max(timestamp, 315532800))  # ZIP dates start in 1980
+    return (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2), ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+
+
+class ZipStream:
+    """Writes a ZIP archive as a sequence of byte chunks, one entry at a time.
+
+    Entries use data descriptors, so sizes and CRCs are emitted after the data
+    and nothing has to be buffered or seeked back to. Only the central
+    directory records (a few dozen bytes per file) are kept until the end.
+    """
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.offset = 0
+        self.records = []
+
+    def _emit(self, data: bytes) -> bytes:
+        self.offset += len(data)
+        return data
+
+    def _local_header(self, name: bytes, method: int, mtime: float, zip64: bool) -> bytes:
+        dos_time, dos_date = _dos_datetime(mtime)
+        extra = struct.pack("<HHQQ", 0x0001, 16, 0, 0) if zip64 else b""
+        size = ZIP64_LIMIT if zip64 else 0
+        return struct.pack(
+            "<IHHHHHIIIHH", 0x04034B50, 45 if zip64 else 20, 0x0808, method,
+            dos_time, dos_date, 0, size, size, len(name), len(extra),
+        ) + name + extra
+
+    def _relay(self, source):
+        while True:
+            try:
+                block = next(source)
+            except StopIteration as stop:
+                return stop.value
+            yield self._emit(block)
+
+    def entry(self, arcname: str, chunks=None, mtime: float = 0, mode: int = 0o644, size_hint: int = 0,
+              compress: bool = True, deflated=None):
+        """Yield the bytes of one entry.
+
+        ``chunks`` yields the raw file content. Alternatively ``deflated`` is a
+        generator of raw deflate data that returns ``(crc, size)`` when done;
+        it is copied through untouched.
+        """
+        name = arcname.replace(os.sep, "/").encode("utf-8")
+        method = 8 if compress or deflated is not None else 0
+        zip64 = size_hint >= ZIP64_LIMIT
+        header_offset = self.offset
+        yield self._emit(self._local_header(name, method, mtime, zip64))
+        data_start = self.offset
+        if deflated is not None:
+            crc, usize = yield from self._relay(deflated)
+            csize = self.offset - data_start
+        else:
+            crc, csize, usize = 0, 0, 0
+            deflater = zlib.compressobj(6, zlib.DEFLATED, -15) if compress else None
+            for block in chunks:
+                crc = zlib.crc32(block, crc)
+                usize += len(block)
+                out = deflater.compress(block) if deflater else block
+                if out:
+                    csize += len(out)
+                    yield self._emit(out)
+            if deflater:
+                out = deflater.flush()
+                csize += len(out)
+                if out:
+                    yield self._emit(out)
+        if zip64:
+            yield self._emit(struct.pack("<IIQQ", 0x08074B50, crc, csize, usize))
+        else:
+            yield self._emit(struct.pack("<IIII", 0x08074B50, crc, csize, usize))
+        self.records.append((name, method, mtime, mode, crc, csize, usize, header_offset))
+
+    def finish(self):
+        """Yield the central directory and end-of-archive records."""
+        start = self.offset
+        for name, method, mtime, mode, crc, csize, usize, header_offset in self.records:
+            dos_time, dos_date = _dos_datetime(mtime)
+            overflow = [v for v in (usize, csize, header_offset) if v >= ZIP64_LIMIT]
+            extra = struct.pack("<HH", 0x0001, 8 * len(overflow)) + b"".join(struct.pack("<Q", v) for v in overflow) if overflow else b""
+            yield self._emit(struct.pack(
+                "<IHHHHHHIIIHHHHHII", 0x02014B50, (3 << 8) | 45, 45 if overflow else 20, 0x0808, method,
+                dos_time, dos_date, crc, min(csize, ZIP64_LIMIT), min(usize, ZIP64_LIMIT),
+                len(name), len(extra), 0, 0, 0, (0o100000 | mode) << 16, min(header_offset, ZIP64_LIMIT),
+            ) + name + extra)
+        size, count = self.offset - start, len(self.records)
+        if count >= 0xFFFF or start >= ZIP64_LIMIT or size >= ZIP64_LIMIT:
+            zip64_end = self.offset
+            yield self._emit(struct.pack("<IQHHIIQQQQ", 0x06064B50, 44, 45, 45, 0, 0, count, count, size, start))
+            yield self._emit(struct.pack("<IIQI", 0x07064B50, 0, zip64_end, 1))
+        yield self._emit(struct.pack(
+            "<IHHHHIIH", 0x06054B50, 0, 0, min(count, 0xFFFF), min(count, 0xFFFF),
+            min(size, ZIP64_LIMIT), min(start, ZIP64_LIMIT), 0,
+        ))
+
+
+def read_chunks(path: str, chunk_size: int = CHUNK_SIZE):
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(chunk_size)
+            if not block:
+                return
+            yield block
+
+
+def iter_files(root: str, excluded_dirs=(), excluded_paths=()):
+    """Yield ``(path, relpath, stat)`` for every regular file under ``root``, in a stable order."""
+    excluded_dirs = set(excluded_dirs)
+    excluded_paths = {os.path.abspath(p) for p in excluded_paths}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(
+            d for d in dirnames
+            if d not in excluded_dirs and os.path.abspath(os.path.join(dirpath, d)) not in excluded_paths
+        )
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            if os.path.abspath(path) in excluded_paths:
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if not os.path.isfile(path):
+                continue
+            yield path, os.path.relpath(path, root), st
+
+
+def sqlite_snapshot(db_path: str) -> str:
+    """Copy a live SQLite database to a temp file with the online backup API.
+
+    The copy is transactionally consistent even while other workers write.
+    The caller removes the returned file.
+    """
+    fd, target = tempfile.mkstemp(prefix="export-", suffix=".db")
+    os.close(fd)
+    source = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    dest = sqlite3.connect(target)
+    try:
+        source.backup(dest, pages=1024)
+    finally:
+        dest.close()
+        source.close()
+    return target
+
+
+class CompressedEntryCache:
+    """On-disk cache of raw deflate streams keyed by path, size and mtime.
+
+    The manifest (``manifest.json``) maps each relative path to the stat it
+    was compressed from plus its CRC and sizes; blobs are written next to it.
+    An unchanged file is streamed straight from its blob, so repeat exports
+    only pay for disk reads.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, "manifest.json")
+        self._lock = threading.Lock()
+        self.manifest = self._load()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _blob_name(relpath: str, st) -> str:
+        return hashlib.sha1(f"{relpath}\0{st.st_size}\0{st.st_mtime_ns}".encode("utf-8")).hexdigest()
+
+    def deflated(self, path: str, relpath: str, st, chunk_size: int = CHUNK_SIZE):
+        """Raw deflate data for ``path``: from the cache when the stat matches, else compressed now."""
+        with self._lock:
+            entry = self.manifest.get(relpath)
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            blob = os.path.join(self.directory, entry["blob"])
+            if os.path.exists(blob):
+                self.hits += 1
+                return self._replay(blob, entry["crc"], entry["size"], chunk_size)
+        self.misses += 1
+        return self._compress(path, relpath, st, chunk_size)
+
+    @staticmethod
+    def _replay(blob: str, crc: int, size: int, chunk_size: int):
+        yield from read_chunks(blob, chunk_size)
+        return crc, size
+
+    def _compress(self, path: str, relpath: str, st, chunk_size: int):
+        # The blob is only registered if the file still has the same stat after
+        # reading, so a file edited mid-export is never cached with stale data.
+        os.makedirs(self.directory, exist_ok=True)
+        name = self._blob_name(relpath, st)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".blob-")
+        crc, csize, usize = 0, 0, 0
+        deflater = zlib.compressobj(6, zlib.DEFLATED, -15)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for block in read_chunks(path, chunk_size):
+                    crc = zlib.crc32(block, crc)
+                    usize += len(block)
+                    data = deflater.compress(block)
+                    if data:
+                        out.write(data)
+                        csize += len(data)
+                        yield data
+                data = deflater.flush()
+                if data:
+                    out.write(data)
+                    csize += len(data)
+                    yield data
+            after = os.stat(path)
+            if (after.st_size, after.st_mtime_ns) != (st.st_size, st.st_mtime_ns) or usize != st.st_size:
+                os.remove(tmp)
+                return crc, usize
+            os.replace(tmp, os.path.join(self.directory, name))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        with self._lock:
+            self.manifest[relpath] = {
+                "size": usize, "mtime_ns": st.st_mtime_ns, "crc": crc, "csize": csize, "blob": name,
+            }
+        return crc, usize
+
+    def save(self, seen=None):
+        """Persist the manifest, dropping entries (and blobs) for files not in ``seen``."""
+        with self._lock:
+            if seen is not None:
+                for relpath in [p for p in self.manifest if p not in seen]:
+                    blob = os.path.join(self.directory, self.manifest.pop(relpath)["blob"])
+                    if os.path.exists(blob):
+                        os.remove(blob)
+            snapshot = dict(self.manifest)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".manifest-")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning("Could not save export manifest: %s", e)
+
+
+
+def iter_project_zip(root: str, excluded_dirs=(), excluded_paths=(), cache: CompressedEntryCache = None,
+                     db_path: str = None, db_arcname: str = None, chunk_size: int = CHUNK_SIZE):
+    """Yield a ZIP of ``root`` chunk by chunk.
+
+    With ``db_path`` set, a backup-API snapshot of that SQLite file is added
+    last as ``db_arcname`` so the first bytes are not held up by the copy.
+    """
+    zs = ZipStream(chunk_size)
+    seen = set()
+    for path, relpath, st in iter_files(root, excluded_dirs, excluded_paths):
+        mode = st.st_mode & 0o777
+        if not os.access(path, os.R_OK):
+            # Checked before the local header goes out; after that an entry cannot be skipped.
+            logger.warning("Export skipped unreadable file %s", relpath)
+            continue
+        if os.path.splitext(relpath)[1].lower() in STORED_SUFFIXES:
+            yield from zs.entry(relpath, read_chunks(path, chunk_size), st.st_mtime, mode, st.st_size, compress=False)
+        elif cache is not None:
+            seen.add(relpath)
+            yield from zs.entry(relpath, None, st.st_mtime, mode, st.st_size,
+                                deflated=cache.deflated(path, relpath, st, chunk_size))
+        else:
+            yield from zs.entry(relpath, read_chunks(path, chunk_size), st.st_mtime, mode, st.st_size)
+    if cache is not None:
+        cache.save(seen)
+    if db_path and os.path.exists(db_path):
+        snapshot = sqlite_snapshot(db_path)
+        try:
+            st = os.stat(snapshot)
+            yield from zs.entry(db_arcname or os.path.basename(db_path), read_chunks(snapshot, chunk_size),
+                                time.time(), 0o644, st.st_size)
+        finally:
+            os.remove(snapshot)
+    yield from zs.finish()
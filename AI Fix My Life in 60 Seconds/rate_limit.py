@@ -0,0 +1,188 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+    REDIS_OK = True
+except Exception:
+    redis = None
+    REDIS_OK = False
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_rate(spec: str):
+    """``"20/minute"`` -> ``(capacity, refill_per_second)``; empty or ``"0"`` disables the rule."""
+    spec = (spec or "").strip().lower()
+    if not spec or spec in {"0", "off", "none"}:
+        return None
+    count, _, period = spec.partition("/")
+    seconds = PERIODS.get(period.strip().rstrip("s") or "second")
+    if seconds is None:
+        raise ValueError(f"unknown rate period in {spec!r}")
+    capacity = float(count)
+    return capacity, capacity / seconds
+
+
+class MemoryBucketStore:
+    """Per-process token buckets and expiring counters in a bounded LRU."""
+
+    def __init__(self, max_keys: int = 100000, clock=time.monotonic, wall=time.time):
+        self.max_keys = max_keys
+        self.clock = clock
+        self.wall = wall
+        self._buckets = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: float, rate: float, cost: float = 1.0) -> float:
+        now = self.clock()
+        with self._lock:
+            tokens, stamp = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - stamp) * rate)
+            if tokens >= cost:
+                self._buckets[key] = (tokens - cost, now)
+                retry_after = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                retry_after = (cost - tokens) / rate
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+    def get(self, key: str) -> float:
+        with self._lock:
+            value, expires = self._counters.get(key, (0.0, 0.0))
+            return value if expires > self.wall() else 0.0
+
+    def incr(self, key: str, amount: float, ttl: int) -> float:
+        now = self.wall()
+        with self._lock:
+            value, expires = self._counters.get(key, (0.0, 0.0))
+            if expires <= now:
+                value, expires = 0.0, now + ttl
+                if len(self._counters) >= self.max_keys:
+                    self._counters = {k: v for k, v in self._counters.items() if v[1] > now}
+            self._counters[key] = (value + amount, expires)
+            return value + amount
+
+
+class RedisBucketStore:
+    """Shared buckets so the limits hold across gunicorn workers and hosts."""
+
+    TAKE = """
+    local tokens = tonumber(redis.call('HGET', KEYS[1], 't') or ARGV[1])
+    local stamp = tonumber(redis.call('HGET', KEYS[1], 's') or ARGV[3])
+    tokens = math.min(tonumber(ARGV[1]), tokens + (tonumber(ARGV[3]) - stamp) * tonumber(ARGV[2]))
+    local retry = 0
+    if tokens >= tonumber(ARGV[4]) then tokens = tokens - tonumber(ARGV[4])
+    else retry = (tonumber(ARGV[4]) - tokens) / tonumber(ARGV[2]) end
+    redis.call('HSET', KEYS[1], 't', tokens, 's', ARGV[3])
+    redis.call('EXPIRE', KEYS[1], math.ceil(tonumber(ARGV[1]) / tonumber(ARGV[2])) + 1)
+    return tostring(retry)
+    """
+
+    def __init__(self, url: str, prefix: str = "ratelimit"):
+        self.client = redis.Redis.from_url(url, socket_timeout=0.2)
+        self.prefix = prefix
+        self._take = self.client.register_script(self.TAKE)
+
+    def take(self, key: str, capacity: float, rate: float, cost: float = 1.0) -> float:
+        return float(self._take(keys=[f"{self.prefix}:{key}"], args=[capacity, rate, time.time(), cost]))
+
+    def get(self, key: str) -> float:
+        return float(self.client.get(f"{self.prefix}:{key}") or 0)
+
+    def incr(self, key: str, amount: float, ttl: int) -> float:
+        name = f"{self.prefix}:{key}"
+        pipe = self.client.pipeline()
+        pipe.set(name, 0, ex=ttl, nx=True)
+        pipe.incrbyfloat(name, amount)
+        return float(pipe.execute()[1])
+
+
+class RateLimiter:
+    """Named token-bucket rules over a bucket store.
+
+    ``hit(rule, key)`` returns 0 when the request may proceed, otherwise the
+    seconds until ``cost`` tokens are available. If the store fails the
+    request is let through: an outage of the limiter must not take the site
+    down with it.
+    """
+
+    def __init__(self, store, rules: dict, enabled: bool = True):
+        self.store = store
+        self.rules = {name: parse_rate(spec) for name, spec in rules.items()}
+        self.enabled = enabled
+        self.counters = {name: {"allowed": 0, "limited": 0} for name in self.rules}
+        self._lock = threading.Lock()
+
+    def hit(self, rule: str, key, cost: float = 1.0) -> float:
+        limit = self.rules.get(rule)
+        if not self.enabled or limit is None:
+            return 0.0
+        capacity, rate = limit
+        try:
+            retry_after = self.store.take(f"{rule}:{key}", capacity, rate, min(cost, capacity))
+        except Exception as e:
+            logger.warning("Rate limit store unavailable: %s", e)
+            return 0.0
+        with self._lock:
+            self.counters[rule]["limited" if retry_after else "allowed"] += 1
+        return retry_after
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {name: dict(c) for name, c in self.counters.items()}
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+class DailyQuota:
+    """Per-user LLM token budget that resets at midnight UTC.
+
+    Callers ``check`` before an upstream call (raises ``QuotaExceeded``) and
+    ``charge`` the tokens the API reported afterwards, so one call may
+    overshoot the budget by at most its own size.
+    """
+
+    def __init__(self, store, tokens_per_day: int, today=None):
+        self.store = store
+        self.tokens_per_day = max(0, int(tokens_per_day))
+        self.today = today or (lambda: datetime.now(timezone.utc).date())
+        self.exceeded = 0
+        self._lock = threading.Lock()
+
+    def _key(self, user_id) -> str:
+        return f"quota:{user_id}:{self.today():%Y%m%d}"
+
+    def used(self, user_id) -> float:
+        try:
+            return self.store.get(self._key(user_id))
+        except Exception as e:
+            logger.warning("Quota store unavailable: %s", e)
+            return 0.0
+
+    def check(self, user_id):
+        if not self.tokens_per_day or user_id is None:
+            return
+        if self.used(user_id) >= self.tokens_per_day:
+            with self._lock:
+                self.exceeded += 1
+            raise QuotaExceeded(f"daily AI quota of {self.tokens_per_day} tokens reached")
+
+    def charge(self, user_id, tokens: int):
+        if not self.tokens_per_day or user_id is None or not tokens:
+            return
+        try:
+            self.store.incr(self._key(user_id), tokens, 2 * 86400)
+        except Exception as e:
+            logger.warning("Quota store unavailable: %s", e)
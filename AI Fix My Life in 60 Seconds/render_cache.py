@@ -0,0 +1,66 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Per-request values are rendered as these markers and swapped in when the page is
+# assembled, so one cached fragment serves every session.
+CSRF_PLACEHOLDER = "\x00csrf\x00"
+INDEX_PLACEHOLDER = "\x00index\x00"
+
+
+def make_etag(*parts) -> str:
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+
+
+class FragmentCache:
+    """Bounded LRU of rendered HTML fragments.
+
+    Each id keeps a single entry tagged with its version (e.g. ``updated_at``);
+    a lookup with any other version is a miss, so an edit in another worker
+    never serves stale markup. ``invalidate`` drops an id outright.
+    """
+
+    def __init__(self, max_entries: int = 5000):
+        self.max_entries = max(0, int(max_entries))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.counters["hits"] += 1
+                return entry[1]
+            self.counters["misses"] += 1
+            return None
+
+    def set(self, key, version, html: str):
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._entries[key] = (version, html)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_render(self, key, version, render) -> str:
+        html = self.get(key, version)
+        if html is None:
+            html = render()
+            self.set(key, version, html)
+        return html
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.counters["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counters, "entries": len(self._entries)}
@@ -0,0 +1,244 @@
+import html
+import logging
+import re
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Control characters survive FTS tokenisation untouched and never appear in user text,
+# so snippets can be HTML-escaped safely before the highlight tags are put back.
+MARK_START, MARK_END = "\x02", "\x03"
+
+
+def highlight(snippet: str) -> str:
+    escaped = html.escape(snippet or "")
+    return escaped.replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+
+def query_terms(query: str) -> list:
+    return re.findall(r"\w+", (query or "").lower())[:12]
+
+
+class SqliteFtsBackend:
+    """SQLite FTS5 index. The owner column carries a ``u<id>`` token so the
+    per-user filter is answered by the full-text index rather than a post-filter."""
+
+    name = "sqlite-fts5"
+
+    def create(self, conn):
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS item_fts USING fts5("
+            "owner, title, content, ai_fix, tokenize='unicode61 remove_diacritics 2')"
+        ))
+
+    def drop(self, conn):
+        conn.execute(text("DROP TABLE IF EXISTS item_fts"))
+
+    def clear(self, conn):
+        conn.execute(text("DELETE FROM item_fts"))
+
+    def _index(self, conn, where: str, params: dict):
+        conn.execute(text(f"DELETE FROM item_fts WHERE rowid IN (SELECT id FROM item WHERE {where})"), params)
+        conn.execute(text(
+            "INSERT INTO item_fts (rowid, owner, title, content, ai_fix) "
+            "SELECT id, 'u' || user_id, title, content, coalesce(ai_fix, '') "
+            f"FROM item WHERE {where}"
+        ), params)
+
+    def index_ids(self, conn, ids):
+        ids = [int(i) for i in ids]
+        if ids:
+            self._index(conn, f"id IN ({','.join(map(str, ids))})", {})
+
+    def index_range(self, conn, low: int, high: int):
+        self._index(conn, "id > :low AND id <= :high", {"low": low, "high": high})
+
+    def delete(self, conn, item_id: int):
+        conn.execute(text("DELETE FROM item_fts WHERE rowid = :id"), {"id": item_id})
+
+    def search(self, conn, user_id: int, query: str, limit: int, offset: int) -> list:
+        terms = query_terms(query)
+        if not terms:
+            return []
+        phrase = " ".join(f'"{t}"' for t in terms[:-1]) + f' "{terms[-1]}"*'
+        match = f'owner:"u{int(user_id)}" AND {{title content ai_fix}} : ({phrase})'
+        rows = conn.execute(text(
+            "SELECT rowid, title, bm25(item_fts, 0.0, 5.0, 2.0, 1.0) AS rank, "
+            f"snippet(item_fts, 2, '{MARK_START}', '{MARK_END}', '…', 16), "
+            f"snippet(item_fts, 3, '{MARK_START}', '{MARK_END}', '…', 16) "
+            "FROM item_fts WHERE item_fts MATCH :match ORDER BY rank LIMIT :limit OFFSET :offset"
+        ), {"match": match, "limit": limit, "offset": offset}).all()
+        results = []
+        for item_id, title, rank, content_snip, fix_snip in rows:
+            snip = content_snip if MARK_START in (content_snip or "") or MARK_START not in (fix_snip or "") else fix_snip
+            results.append({"id": item_id, "title": title, "rank": round(-rank, 4), "snippet": highlight(snip)})
+        return results
+
+
+class PostgresTsvectorBackend:
+    """Postgres side table with a weighted ``tsvector`` and a GIN index."""
+
+    name = "postgres-tsvector"
+    document = (
+        "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(content, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(ai_fix, '')), 'C')"
+    )
+
+    def create(self, conn):
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS item_search ("
+            "item_id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, title TEXT, body TEXT, document TSVECTOR)"
+        ))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_item_search_document ON item_search USING GIN (document)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_item_search_user ON item_search (user_id)"))
+
+    def drop(self, conn):
+        conn.execute(text("DROP TABLE IF EXISTS item_search"))
+
+    def clear(self, conn):
+        conn.execute(text("TRUNCATE item_search"))
+
+    def _index(self, conn, where: str, params: dict):
+        conn.execute(text(
+            "INSERT INTO item_search (item_id, user_id, title, body, document) "
+            f"SELECT id, user_id, title, content || E'\\n' || coalesce(ai_fix, ''), {self.document} "
+            f"FROM item WHERE {where} "
+            "ON CONFLICT (item_id) DO UPDATE SET user_id = EXCLUDED.user_id, title = EXCLUDED.title, "
+            "body = EXCLUDED.body, document = EXCLUDED.document"
+        ), params)
+
+    def index_ids(self, conn, ids):
+        ids = [int(i) for i in ids]
+        if ids:
+            self._index(conn, "id = ANY(:ids)", {"ids": ids})
+
+    def index_range(self, conn, low: int, high: int):
+        self._index(conn, "id > :low AND id <= :high", {"low": low, "high": high})
+
+    def delete(self, conn, item_id: int):
+        conn.execute(text("DELETE FROM item_search WHERE item_id = :id"), {"id": item_id})
+
+    def search(self, conn, user_id: int, query: str, limit: int, offset: int) -> list:
+        terms = query_terms(query)
+        if not terms:
+            return []
+        tsquery = " & ".join(terms[:-1] + [terms[-1] + ":*"])
+        rows = conn.execute(text(
+            "SELECT item_id, title, ts_rank(document, q) AS rank, "
+            f"ts_headline('simple', body, q, 'StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=24, MinWords=8') "
+            "FROM item_search, to_tsquery('simple', :q) AS q "
+            "WHERE user_id = :uid AND document @@ q ORDER BY rank DESC, item_id DESC LIMIT :limit OFFSET :offset"
+        ), {"q": tsquery, "uid": user_id, "limit": limit, "offset": offset}).all()
+        return [
+            {"id": item_id, "title": title, "rank": round(rank, 4), "snippet": highlight(snip)}
+            for item_id, title, rank, snip in rows
+        ]
+
+
+class LikeBackend:
+    """Fallback for databases without a full-text engine: no index, LIKE scan."""
+
+    name = "like"
+
+    def create(self, conn):
+        pass
+
+    def drop(self, conn):
+        pass
+
+    def clear(self, conn):
+        pass
+
+    def index_ids(self, conn, ids):
+        pass
+
+    def index_range(self, conn, low: int, high: int):
+        pass
+
+    def delete(self, conn, item_id: int):
+        pass
+
+    def search(self, conn, user_id: int, query: str, limit: int, offset: int) -> list:
+        terms = query_terms(query)
+        if not terms:
+            return []
+        clauses = " AND ".join(
+            f"(lower(title) LIKE :t{i} OR lower(content) LIKE :t{i} OR lower(coalesce(ai_fix, '')) LIKE :t{i})"
+            for i in range(len(terms))
+        )
+        params = {f"t{i}": f"%{t}%" for i, t in enumerate(terms)}
+        params.update({"uid": user_id, "limit": limit, "offset": offset})
+        rows = conn.execute(text(
+            f"SELECT id, title, content FROM item WHERE user_id = :uid AND {clauses} "
+            "ORDER BY updated_at DESC LIMIT :limit OFFSET :offset"
+        ), params).all()
+        results = []
+        for item_id, title, content in rows:
+            pos = max(0, (content or "").lower().find(terms[0]))
+            piece = (content or "")[max(0, pos - 60):pos + 100]
+            results.append({"id": item_id, "title": title, "rank": 0.0, "snippet": html.escape(piece)})
+        return results
+
+
+class SearchIndex:
+    """Picks a backend per SQL dialect and creates its storage on first use."""
+
+    def __init__(self):
+        self._backends = {}
+        self._ready = set()
+
+    def backend(self, conn):
+        dialect = conn.dialect.name
+        if dialect not in self._backends:
+            if dialect == "sqlite" and self._has_fts5(conn):
+                self._backends[dialect] = SqliteFtsBackend()
+            elif dialect == "postgresql":
+                self._backends[dialect] = PostgresTsvectorBackend()
+            else:
+                logger.warning("No full-text engine for %s; search falls back to LIKE", dialect)
+                self._backends[dialect] = LikeBackend()
+        backend = self._backends[dialect]
+        if dialect not in self._ready:
+            backend.create(conn)
+            self._ready.add(dialect)
+        return backend
+
+    def create(self, conn):
+        self._ready.discard(conn.dialect.name)
+        self.backend(conn)
+
+    def drop(self, conn):
+        self.backend(conn).drop(conn)
+        self._ready.discard(conn.dialect.name)
+
+    @staticmethod
+    def _has_fts5(conn) -> bool:
+        options = {row[0] for row in conn.execute(text("PRAGMA compile_options"))}
+        return "ENABLE_FTS5" in options
+
+    def index_ids(self, conn, ids):
+        self.backend(conn).index_ids(conn, ids)
+
+    def delete(self, conn, item_id: int):
+        self.backend(conn).delete(conn, item_id)
+
+    def search(self, conn, user_id: int, query: str, limit: int = 20, offset: int = 0) -> list:
+        return self.backend(conn).search(conn, user_id, query, limit, offset)
+
+    def reindex(self, conn_factory, max_id: int, batch_size: int = 5000, progress=None) -> int:
+        """Rebuild the whole index in id ranges, one transaction per batch."""
+        with conn_factory() as conn:
+            self.backend(conn).clear(conn)
+            conn.commit()
+        low = 0
+        while low < max_id:
+            high = low + batch_size
+            with conn_factory() as conn:
+                self.backend(conn).index_range(conn, low, high)
+                conn.commit()
+            low = high
+            if progress:
+                progress(min(high, max_id))
+        return max_id
@@ -0,0 +1,228 @@
+import threading
+import time
+
+import pytest
+
+from ai_client import AIDeadlineExceeded, AIQueueTimeout, CircuitOpenError, ResilientAIClient, STATE_PREFIX
+
+
+class UpstreamError(Exception):
+    def __init__(self, status_code=None):
+        super().__init__(f"upstream said {status_code}")
+        self.status_code = status_code
+
+
+class FakeCompletions:
+    """Fault-simulating stand-in for ``chat.completions.create``.
+
+    ``script`` holds one entry per call: an exception to raise or a value to
+    return; once it runs out every call succeeds with ``"ok"``.
+    """
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, **kwargs):
+        with self._lock:
+            self.calls += 1
+            outcome = self.script.pop(0) if self.script else "ok"
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def make_client(create, clock, **kwargs):
+    sleeps = []
+    options = dict(timeout=5.0, retries=2, backoff=0.5, failure_threshold=3, reset_after=30.0, clock=clock,
+                   sleep=sleeps.append)
+    options.update(kwargs)
+    client = ResilientAIClient(create, **options)
+    client.sleeps = sleeps
+    return client
+
+
+def test_retries_retryable_errors_then_succeeds(clock):
+    create = FakeCompletions(UpstreamError(503), UpstreamError(429), "fixed")
+    client = make_client(create, clock)
+
+    assert client.complete(model="m") == "fixed"
+    assert create.calls == 3
+    assert len(client.sleeps) == 2
+    state = client.state()
+    assert state["retries"] == 2 and state["failures"] == 2 and state["successes"] == 1
+    assert state["state"] == "closed" and state["consecutive_failures"] == 0
+
+
+def test_client_errors_are_not_retried_or_counted(clock):
+    create = FakeCompletions(UpstreamError(400))
+    client = make_client(create, clock)
+
+    with pytest.raises(UpstreamError):
+        client.complete(model="m")
+    assert create.calls == 1
+    assert client.state()["failures"] == 0
+
+
+def test_gives_up_after_the_retry_budget(clock):
+    create = FakeCompletions(*[UpstreamError(500)] * 5)
+    client = make_client(create, clock, retries=1, failure_threshold=10)
+
+    with pytest.raises(UpstreamError):
+        client.complete(model="m")
+    assert create.calls == 2
+
+
+def test_trips_open_and_short_circuits(clock, tmp_path):
+    state_path = tmp_path / "fallback.txt"
+    create = FakeCompletions(*[UpstreamError(500)] * 3)
+    client = make_client(create, clock, retries=0, state_path=str(state_path))
+
+    for _ in range(3):
+        with pytest.raises(UpstreamError):
+            client.complete(model="m")
+    assert client.state()["state"] == "open"
+    assert state_path.read_text().startswith(STATE_PREFIX)
+
+    with pytest.raises(CircuitOpenError):
+        client.complete(model="m")
+    assert create.calls == 3
+    assert client.state()["short_circuits"] == 1
+
+
+def test_half_open_probe_closes_on_success(clock, tmp_path):
+    state_path = tmp_path / "fallback.txt"
+    create = FakeCompletions(*[UpstreamError(500)] * 3)
+    client = make_client(create, clock, retries=0, state_path=str(state_path))
+    for _ in range(3):
+        with pytest.raises(UpstreamError):
+            client.complete(model="m")
+
+    clock.advance(29)
+    with pytest.raises(CircuitOpenError):
+        client.complete(model="m")
+    clock.advance(2)
+    assert client.complete(model="m") == "ok"
+    assert client.state()["state"] == "closed"
+    assert not state_path.exists()
+
+
+def test_failed_probe_reopens(clock):
+    create = FakeCompletions(*[UpstreamError(500)] * 4)
+    client = make_client(create, clock, retries=0)
+    for _ in range(3):
+        with pytest.raises(UpstreamError):
+            client.complete(model="m")
+
+    clock.advance(31)
+    with pytest.raises(UpstreamError):
+        client.complete(model="m")
+    assert client.state()["state"] == "open"
+    assert client.state()["trips"] == 2
+    with pytest.raises(CircuitOpenError):
+        client.complete(model="m")
+
+
+def test_only_one_probe_while_half_open(clock):
+    release = threading.Event()
+    create = FakeCompletions(*[UpstreamError(500)] * 3)
+    client = make_client(create, clock, retries=0)
+    for _ in range(3):
+        with pytest.raises(UpstreamError):
+            client.complete(model="m")
+    clock.advance(31)
+
+    client.create = lambda **kwargs: release.wait(5) and "ok"
+    probe = threading.Thread(target=client.complete, kwargs={"model": "m"})
+    probe.start()
+    try:
+        for _ in range(100):
+            if client.state()["state"] == "half_open":
+                break
+            time.sleep(0.01)
+        with pytest.raises(CircuitOpenError):
+            client.complete(model="m")
+    finally:
+        release.set()
+        probe.join()
+    assert client.state()["state"] == "closed"
+
+
+def test_deadline_covers_a_hung_upstream():
+    release = threading.Event()
+    calls = []
+
+    def hang(**kwargs):
+        calls.append(kwargs)
+        release.wait(5)
+        return "late"
+
+    client = ResilientAIClient(hang, timeout=0.1, retries=2, failure_threshold=10)
+    try:
+        with pytest.raises(AIDeadlineExceeded):
+            client.complete(model="m")
+    finally:
+        release.set()
+    assert len(calls) == 1
+    assert client.state()["timeouts"] == 1 and client.state()["failures"] == 1
+
+
+def test_calls_queued_past_the_deadline_never_reach_upstream():
+    release = threading.Event()
+    started = threading.Semaphore(0)
+    calls = []
+
+    def hang(**kwargs):
+        calls.append(kwargs)
+        started.release()
+        release.wait(5)
+        return "late"
+
+    client = ResilientAIClient(hang, timeout=0.3, retries=0, failure_threshold=100, max_threads=2)
+    outcomes = []
+
+    def occupy():
+        try:
+            client.complete(model="m")
+        except Exception as e:
+            outcomes.append(type(e))
+
+    busy = [threading.Thread(target=occupy) for _ in range(2)]
+    for thread in busy:
+        thread.start()
+    for _ in busy:
+        assert started.acquire(timeout=5)
+    try:
+        with pytest.raises(AIQueueTimeout):
+            client.complete(model="m")
+    finally:
+        release.set()
+        for thread in busy:
+            thread.join()
+    client._executor().shutdown(wait=True)
+
+    assert len(calls) == 2
+    assert outcomes == [AIDeadlineExceeded, AIDeadlineExceeded]
+    state = client.state()
+    assert state["queue_timeouts"] == 1
+    assert state["failures"] == 2  # only the two calls that reached upstream
+
+
+def test_hedge_takes_the_faster_duplicate():
+    release = threading.Event()
+    calls = []
+
+    def slow_then_fast(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            release.wait(5)
+            return "slow"
+        return "fast"
+
+    client = ResilientAIClient(slow_then_fast, timeout=2.0, hedge_after=0.05)
+    try:
+        assert client.complete(model="m") == "fast"
+    finally:
+        release.set()
+    assert client.state()["hedges"] == 1
@@ -0,0 +1,81 @@
+import threading
+
+from flask import Flask
+
+from ai_jobs import FixJobQueue
+
+
+def make_queue(runner, **kwargs):
+    return FixJobQueue(Flask(__name__), runner, **kwargs)
+
+
+def test_jobs_run_round_robin_across_owners():
+    gate, running, order = threading.Event(), threading.Event(), []
+
+    def runner(job_id):
+        running.set()
+        gate.wait(5)
+        order.append(job_id)
+
+    queue = make_queue(runner, max_workers=1)
+    queue.submit(("heavy", 0), owner="heavy")
+    assert running.wait(5)
+    for n in range(1, 5):
+        queue.submit(("heavy", n), owner="heavy")
+    for n in range(2):
+        queue.submit(("light", n), owner="light")
+    queue.submit(("other", 0), owner="other")
+    assert queue.pending() == 7  # the first heavy job is already running
+    gate.set()
+    queue.shutdown(wait=True)
+
+    assert order[:2] == [("heavy", 0), ("heavy", 1)]
+    assert order[2:5] == [("light", 0), ("other", 0), ("heavy", 2)]
+    assert order[5:] == [("light", 1), ("heavy", 3), ("heavy", 4)]
+    assert queue.pending() == 0
+
+
+def test_jobs_of_one_owner_keep_their_order():
+    order = []
+    queue = make_queue(order.append, max_workers=1)
+    for n in range(4):
+        queue.submit(n, owner="u")
+    queue.shutdown(wait=True)
+    assert order == [0, 1, 2, 3]
+
+
+def test_runner_gets_an_app_context():
+    from flask import current_app
+
+    seen = []
+    app = Flask("ctx")
+    queue = FixJobQueue(app, lambda job_id: seen.append(current_app.name), eager=True)
+    queue.submit(1)
+    assert seen == ["ctx"]
+
+
+def test_a_crashing_job_does_not_stop_the_queue():
+    order = []
+
+    def runner(job_id):
+        if job_id == 1:
+            raise RuntimeError("boom")
+        order.append(job_id)
+
+    queue = make_queue(runner, max_workers=1)
+    for n in range(3):
+        queue.submit(n, owner="u")
+    queue.shutdown(wait=True)
+    assert order == [0, 2]
+
+
+def test_shutdown_does_not_deadlock_with_queued_work():
+    gate = threading.Event()
+    queue = make_queue(lambda job_id: gate.wait(5), max_workers=2)
+    for n in range(6):
+        queue.submit(n, owner=n % 3)
+    stopper = threading.Thread(target=queue.shutdown)
+    stopper.start()
+    gate.set()
+    stopper.join(10)
+    assert not stopper.is_alive()
@@ -0,0 +1,94 @@
+import importlib
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def webapp(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp("fix-jobs")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DATABASE_URL", f"sqlite:///{workdir}/app.db")
+        mp.setenv("EXPORT_CACHE_DIR", str(workdir / "export-cache"))
+        mp.setenv("OPENAI_API_KEY", "")
+        module = importlib.import_module("app")
+    module.db_path = workdir / "app.db"
+    with module.app.app_context():
+        module.db.create_all()
+        user = module.User(username="jobs", email="jobs@example.com", password="x")
+        module.db.session.add(user)
+        module.db.session.commit()
+        module.user_id = user.id
+    return module
+
+
+class FakeClient:
+    """Stands in for the OpenAI client; ``during_call`` runs while the "model" is busy."""
+
+    def __init__(self, during_call=None):
+        self.during_call = during_call
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        if self.during_call:
+            self.during_call()
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="FAKE FIX"))])
+
+
+def queue_job(webapp, content):
+    item = webapp.Item(title="t", content=content, content_hash=webapp._content_hash(content),
+                       fix_status="pending", user_id=webapp.user_id)
+    webapp.db.session.add(item)
+    webapp.db.session.flush()
+    job = webapp.FixJob(item_id=item.id)
+    webapp.db.session.add(job)
+    webapp.db.session.commit()
+    return item.id, job.id
+
+
+def run_job(webapp, monkeypatch, content, during_call):
+    monkeypatch.setattr(webapp, "AI_CLIENT", FakeClient(during_call))
+    monkeypatch.setattr(webapp, "AI_ENABLED", True)
+    with webapp.app.app_context():
+        item_id, job_id = queue_job(webapp, content)
+        webapp._run_fix_job(job_id)
+        webapp.db.session.remove()
+        return webapp.db.session.get(webapp.Item, item_id), webapp.db.session.get(webapp.FixJob, job_id)
+
+
+def test_fix_job_holds_no_write_lock_during_the_model_call(webapp, monkeypatch):
+    writes = []
+
+    def write_elsewhere():
+        # timeout=0: fails at once if the job still has a write transaction open.
+        conn = sqlite3.connect(webapp.db_path, timeout=0)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.rollback()
+            writes.append("ok")
+        except sqlite3.OperationalError as e:
+            writes.append(str(e))
+        finally:
+            conn.close()
+
+    item, job = run_job(webapp, monkeypatch, "missed every deadline this week", write_elsewhere)
+
+    assert writes == ["ok"]
+    assert (job.status, job.source, job.error) == ("done", "ai", None)
+    assert job.queue_ms is not None and job.run_ms is not None and job.finished_at is not None
+    assert (item.ai_fix, item.fix_status, item.fix_source) == ("FAKE FIX", "ready", "ai")
+
+
+def test_fix_job_for_content_edited_mid_call_is_stale(webapp, monkeypatch):
+    content = "inbox has four thousand unread mails"
+
+    def edit_elsewhere():
+        with sqlite3.connect(webapp.db_path) as conn:
+            conn.execute("UPDATE item SET content = 'edited', content_hash = 'edited' WHERE content = ?", (content,))
+
+    item, job = run_job(webapp, monkeypatch, content, edit_elsewhere)
+
+    assert job.status == "stale"
+    assert item.content == "edited"
+    assert (item.ai_fix, item.fix_status) == (None, "pending")
@@ -0,0 +1,95 @@
+from datetime import date, timedelta
+
+import pytest
+
+from rate_limit import DailyQuota, MemoryBucketStore, QuotaExceeded, RateLimiter, parse_rate
+
+
+def test_parse_rate():
+    assert parse_rate("20/minute") == (20.0, 20 / 60)
+    assert parse_rate("5/hours") == (5.0, 5 / 3600)
+    assert parse_rate("3") == (3.0, 3.0)
+    for off in ("", "0", "off", None):
+        assert parse_rate(off) is None
+    with pytest.raises(ValueError):
+        parse_rate("5/fortnight")
+
+
+def test_bucket_allows_a_burst_then_refills(clock):
+    limiter = RateLimiter(MemoryBucketStore(clock=clock), {"auth": "3/minute"})
+
+    assert [limiter.hit("auth", "ip:1") for _ in range(3)] == [0, 0, 0]
+    assert limiter.hit("auth", "ip:1") == pytest.approx(20.0)
+    assert limiter.hit("auth", "ip:2") == 0  # buckets are per key
+
+    clock.advance(19)
+    assert limiter.hit("auth", "ip:1") == pytest.approx(1.0)
+    clock.advance(1)
+    assert limiter.hit("auth", "ip:1") == 0
+    assert limiter.stats()["auth"] == {"allowed": 5, "limited": 2}
+
+
+def test_cost_is_capped_at_capacity(clock):
+    limiter = RateLimiter(MemoryBucketStore(clock=clock), {"ai": "4/minute"})
+
+    assert limiter.hit("ai", "user:1", cost=10) == 0
+    assert limiter.hit("ai", "user:1") == pytest.approx(15.0)
+
+
+def test_disabled_and_unknown_rules_always_allow(clock):
+    store = MemoryBucketStore(clock=clock)
+    assert RateLimiter(store, {"ip": "1/minute"}, enabled=False).hit("ip", "a") == 0
+    limiter = RateLimiter(store, {"ip": "", "save": "1/minute"})
+    assert [limiter.hit("ip", "a") for _ in range(3)] == [0, 0, 0]
+    assert limiter.hit("missing", "a") == 0
+
+
+def test_store_outage_fails_open():
+    class DownStore:
+        def take(self, *args):
+            raise ConnectionError("redis down")
+
+    assert RateLimiter(DownStore(), {"ip": "1/minute"}).hit("ip", "a") == 0
+
+
+def test_lru_bounds_the_number_of_buckets(clock):
+    store = MemoryBucketStore(max_keys=2, clock=clock)
+    for key in ("a", "b", "c"):
+        store.take(key, 1, 1)
+    assert list(store._buckets) == ["b", "c"]
+
+
+def test_daily_quota_blocks_until_the_next_day(clock):
+    today = [date(2026, 1, 1)]
+    quota = DailyQuota(MemoryBucketStore(clock=clock, wall=clock), tokens_per_day=1000, today=lambda: today[0])
+
+    quota.check(7)
+    quota.charge(7, 600)
+    quota.check(7)
+    quota.charge(7, 500)  # one call may overshoot by its own size
+    assert quota.used(7) == 1100
+    with pytest.raises(QuotaExceeded):
+        quota.check(7)
+    quota.check(8)
+    assert quota.exceeded == 1
+
+    today[0] += timedelta(days=1)
+    quota.check(7)
+    assert quota.used(7) == 0
+
+
+def test_daily_quota_counters_expire(clock):
+    quota = DailyQuota(MemoryBucketStore(clock=clock, wall=clock), tokens_per_day=10, today=lambda: date(2026, 1, 1))
+    quota.charge(1, 50)
+    clock.advance(2 * 86400 + 1)
+    quota.check(1)
+
+
+def test_zero_quota_and_anonymous_users_are_unlimited(clock):
+    store = MemoryBucketStore(clock=clock, wall=clock)
+    unlimited = DailyQuota(store, tokens_per_day=0)
+    unlimited.charge(1, 10 ** 9)
+    unlimited.check(1)
+    limited = DailyQuota(store, tokens_per_day=1)
+    limited.charge(None, 100)
+    limited.check(None)
@@ -0,0 +1,25 @@
+"""WSGI entry point and application factory.
+
+    gunicorn -c gunicorn.conf.py 'wsgi:create_app()'
+
+The routes are bound to the module-level app in ``app.py``, so ``create_app``
+applies ``config`` the way every setting is read: as environment variables,
+before that module is first imported. It then creates any missing tables and
+returns the app. The OpenAI client and SMTP connection are not built here;
+each is opened on first use.
+"""
+import os
+import sys
+
+
+def create_app(config: dict = None):
+    settings = {key: str(value) for key, value in (config or {}).items()}
+    if "app" in sys.modules:
+        # Settings are read once at import; a second, different config cannot take effect.
+        changed = sorted(key for key, value in settings.items() if os.environ.get(key) != value)
+        if changed:
+            raise RuntimeError(f"app is already loaded; cannot apply {', '.join(changed)}")
+    os.environ.update(settings)
+    import app as webapp
+    webapp.boot()
+    return webapp.app